@@ -1,44 +1,127 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
-import json
-from datetime import datetime
-
-app = Flask(__name__)
-app.secret_key = 'your-secret-key'
-
-def format_currency(amount):
-    return f"${amount:.2f}"
-
-@app.route('/')
-def index():
-    return render_template('index.html')
-
-@app.route('/dashboard')
-def dashboard():
-    transactions = json.loads(request.cookies.get('transactions', '[]'))
-    total_income = sum(t['amount'] for t in transactions if t['type'] == 'income')
-    total_expenses = -sum(t['amount'] for t in transactions if t['type'] == 'expense')
-    current_balance = total_income + total_expenses
-    category_expenses = {'labels': ['Food', 'Housing'], 'data': [100, 200]}
-    monthly_expenses = {'labels': ['Jan', 'Feb'], 'data': [300, 400]}
-    return render_template('dashboard.html', total_income=total_income, total_expenses=total_expenses,
-                          current_balance=current_balance, category_expenses=category_expenses,
-                          monthly_expenses=monthly_expenses)
-
-@app.route('/transactions')
-def transactions():
-    return render_template('transactions.html')
-
-@app.route('/goals')
-def goals():
-    return render_template('goals.html')
-
-@app.route('/budget')
-def budget():
-    return render_template('budget.html')
-
-@app.route('/insights')
-def insights():
-    return render_template('insights.html')
-
-if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+import os
+from functools import wraps
+from flask import Flask, g, request
+from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from flask_bcrypt import Bcrypt
+from flask_login import LoginManager
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from passwords import password_hasher
+
+DEFAULT_DATABASE_URL = 'sqlite:///finance_tracker.db'
+
+class RoutingSession(Session):
+    """Sends reads from views marked with use_read_replica to the replica engine"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        # Flushes and anything outside a marked read-only request stay on the primary
+        if bind is None and not self._flushing and g and g.get('read_replica'):
+            replica = db.engines.get('replica')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+bcrypt = Bcrypt()
+login_manager = LoginManager()
+login_manager.login_view = 'login'
+login_manager.login_message_category = 'info'
+
+def use_read_replica(view):
+    """Run a view's GET requests against the read replica when one is configured"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_replica = request.method in ('GET', 'HEAD')
+        return view(*args, **kwargs)
+    return wrapper
+
+def is_sqlite_memory(url):
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def engine_options(url, config):
+    options = {'pool_pre_ping': True}
+    # In-memory SQLite uses a single static connection, so there is no pool to size
+    if not is_sqlite_memory(url):
+        options.update(
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            pool_timeout=config['DB_POOL_TIMEOUT'],
+            pool_recycle=config['DB_POOL_RECYCLE']
+        )
+    if make_url(url).get_backend_name() == 'sqlite':
+        # Wait on a locked database instead of failing immediately
+        options['connect_args'] = {'timeout': config['SQLITE_BUSY_TIMEOUT']}
+    return options
+
+def sqlite_pragmas(app, read_only=False):
+    """Connect listener applying the configured SQLite pragmas to every new connection"""
+    pragmas = [
+        ('synchronous', app.config['SQLITE_SYNCHRONOUS']),
+        ('mmap_size', app.config['SQLITE_MMAP_SIZE']),
+        # Negative cache sizes are in KiB rather than pages
+        ('cache_size', -app.config['SQLITE_CACHE_SIZE_KB']),
+    ]
+    # WAL lets readers run alongside the writer; it is persistent, so only the writable side sets it
+    if not read_only:
+        pragmas.insert(0, ('journal_mode', 'WAL'))
+
+    def apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    return apply
+
+def create_app(config=None):
+    """Build the Flask app and its tuned database engines"""
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY=os.environ.get('SESSION_SECRET', 'your-secret-key'),
+        SQLALCHEMY_DATABASE_URI=os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URL),
+        READ_DATABASE_URL=os.environ.get('READ_DATABASE_URL'),
+        DB_POOL_SIZE=10,
+        DB_MAX_OVERFLOW=20,
+        DB_POOL_TIMEOUT=30,
+        DB_POOL_RECYCLE=1800,
+        SQLITE_BUSY_TIMEOUT=5,
+        SQLITE_SYNCHRONOUS='NORMAL',
+        SQLITE_MMAP_SIZE=256 * 1024 * 1024,
+        SQLITE_CACHE_SIZE_KB=64 * 1024
+    )
+    # Any other setting can come from FLASK_-prefixed environment variables, e.g. FLASK_JOBS_MODE=worker
+    app.config.from_prefixed_env()
+    app.config.update(config or {})
+
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config)
+    if app.config['READ_DATABASE_URL']:
+        replica_url = app.config['READ_DATABASE_URL']
+        app.config['SQLALCHEMY_BINDS'] = {
+            'replica': dict(engine_options(replica_url, app.config), url=replica_url)
+        }
+
+    db.init_app(app)
+    bcrypt.init_app(app)
+    password_hasher.init_app(app)
+    login_manager.init_app(app)
+
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', sqlite_pragmas(app, read_only=bind_key == 'replica'))
+    return app
+
+app = create_app()
+
+# Routes, CLI commands and instrumentation register themselves on the app above
+import models  # noqa: E402,F401
+import storage  # noqa: E402
+import search  # noqa: E402
+import routes  # noqa: E402,F401
+import commands  # noqa: E402,F401
+
+with app.app_context():
+    db.create_all()
+    storage.seed_lookups()
+    search.ensure_search_index()
@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+from collections import namedtuple
+from flask import current_app, request, send_from_directory
+from flask.sessions import SecureCookieSessionInterface
+from compression import accepted_encoding, brotli
+
+FINGERPRINT_LENGTH = 12
+# A fingerprinted URL never changes content, so it may be cached for a year without revalidation
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+PRECOMPRESSED_EXTENSIONS = ('.css', '.js', '.json', '.map', '.svg', '.txt')
+PRECOMPRESS_MIN_BYTES = 256
+
+Asset = namedtuple('Asset', ['filename', 'url_name', 'digest', 'mimetype', 'variants'])
+
+class AssetManifest:
+    """Content-hashed URLs and compressed variants for the static folder, built once at startup"""
+
+    def __init__(self):
+        self.assets = {}
+        self.by_url_name = {}
+
+    def build(self, static_folder):
+        assets = {}
+        for directory, _, names in os.walk(static_folder):
+            for name in names:
+                path = os.path.join(directory, name)
+                filename = os.path.relpath(path, static_folder).replace(os.sep, '/')
+                # Precompressed siblings are variants of another asset, not assets of their own
+                if filename.endswith(('.gz', '.br')):
+                    continue
+                with open(path, 'rb') as stream:
+                    body = stream.read()
+                digest = hashlib.sha256(body).hexdigest()[:FINGERPRINT_LENGTH]
+                root, extension = posixpath.splitext(filename)
+                assets[filename] = Asset(
+                    filename=filename,
+                    url_name=f"{root}.{digest}{extension}",
+                    digest=digest,
+                    mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                    variants=precompressed_variants(path, body)
+                )
+        self.assets = assets
+        self.by_url_name = {asset.url_name: asset for asset in assets.values()}
+        return assets
+
+def precompressed_variants(path, body):
+    """gzip and brotli encodings of a text asset, kept only when smaller than the original"""
+    if not path.endswith(PRECOMPRESSED_EXTENSIONS) or len(body) < PRECOMPRESS_MIN_BYTES:
+        return {}
+    variants = {}
+    for encoding, suffix, compress in (
+        ('br', '.br', (lambda data: brotli.compress(data, quality=11)) if brotli is not None else None),
+        ('gzip', '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)),
+    ):
+        # A deploy step may ship its own (e.g. zopfli) variants; use them unless the source is newer
+        sibling = path + suffix
+        if os.path.exists(sibling) and os.path.getmtime(sibling) >= os.path.getmtime(path):
+            with open(sibling, 'rb') as stream:
+                encoded = stream.read()
+        elif compress is not None:
+            encoded = compress(body)
+        else:
+            continue
+        if len(encoded) < len(body):
+            variants[encoding] = encoded
+    return variants
+
+asset_manifest = AssetManifest()
+
+class StaticSessionInterface(SecureCookieSessionInterface):
+    """Cookie sessions that leave static responses alone
+
+    Flask-Login reads the session after every request, which would add Vary: Cookie; the signed
+    cookie changes on each page view, so browsers would then never reuse a cached asset.
+    """
+
+    def save_session(self, app, session, response):
+        if request.endpoint == 'static':
+            return
+        super().save_session(app, session, response)
+
+def serve_static(filename):
+    """Static view: fingerprinted names are immutable and precompressed, others are served as before"""
+    asset = asset_manifest.by_url_name.get(filename)
+    if asset is None:
+        return current_app.send_static_file(filename)
+    encoding = accepted_encoding(asset.variants)
+    if encoding is None:
+        response = send_from_directory(
+            current_app.static_folder, asset.filename, conditional=False, max_age=IMMUTABLE_MAX_AGE
+        )
+    else:
+        response = current_app.response_class(asset.variants[encoding], mimetype=asset.mimetype)
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(f"{asset.digest}-{encoding or 'identity'}")
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+def init_assets(app):
+    """Fingerprint url_for('static', ...) URLs and serve them with far-future caching"""
+    if not app.config.get('STATIC_FINGERPRINTS', True) or not app.has_static_folder:
+        return None
+    asset_manifest.build(app.static_folder)
+    app.view_functions['static'] = serve_static
+    if type(app.session_interface) is SecureCookieSessionInterface:
+        app.session_interface = StaticSessionInterface()
+
+    @app.url_defaults
+    def fingerprint_static_url(endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            asset = asset_manifest.assets.get(values['filename'])
+            if asset is not None:
+                values['filename'] = asset.url_name
+
+    return asset_manifest
@@ -0,0 +1,129 @@
+import asyncio
+from flask import jsonify
+from flask_login import current_user, login_required
+from sqlalchemy import event, select
+from sqlalchemy.pool import NullPool
+from app import app, db, sqlite_pragmas
+from models import Transaction, SavingGoal, Budget, MonthlyRollup
+from routes import serialize_transaction, transaction_page_args
+from utils import (
+    budget_period_starts, calculate_budget_status, summarize_rollups,
+    calculate_category_expenses_from_rollups, calculate_monthly_expenses_from_rollups, generate_insights_from_rollups
+)
+
+try:
+    import aiosqlite  # noqa: F401
+    import asgiref  # noqa: F401
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+except ImportError as e:
+    raise ImportError("The async read API needs aiosqlite and Flask's async extra (asgiref)") from e
+
+def get_async_engine():
+    engine = app.extensions.get('async_engine')
+    if engine is None:
+        # Read-only, so it follows the replica when one is configured
+        replica = 'replica' in db.engines
+        source = db.engines['replica'] if replica else db.engine
+        # Flask runs each async view in its own event loop, so aiosqlite connections cannot be pooled across requests
+        engine = create_async_engine(
+            source.url.set(drivername='sqlite+aiosqlite'), poolclass=NullPool,
+            connect_args={'timeout': app.config['SQLITE_BUSY_TIMEOUT']}
+        )
+        event.listen(engine.sync_engine, 'connect', sqlite_pragmas(app, read_only=replica))
+        app.extensions['async_engine'] = engine
+    return engine
+
+async def fetch_scalars(statement):
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        return (await session.scalars(statement)).all()
+
+async def fetch_rows(statement):
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        return (await session.execute(statement)).all()
+
+def rollups_statement(user_id):
+    return select(MonthlyRollup).filter_by(user_id=user_id).order_by(MonthlyRollup.year_month)
+
+def budgets_statement(user_id):
+    return select(Budget).filter_by(user_id=user_id)
+
+def serialize_goal(goal):
+    return {
+        'id': goal.id,
+        'name': goal.name,
+        'target_amount': goal.target_amount,
+        'current_amount': goal.current_amount,
+        'deadline': goal.deadline.isoformat(),
+        'progress': min(goal.current_amount / goal.target_amount * 100, 100) if goal.target_amount else 0
+    }
+
+@app.route('/api/async/transactions')
+@login_required
+async def async_transactions():
+    try:
+        args = transaction_page_args()
+        statement = Transaction.transactions_statement(
+            current_user.id, args['page_size'] + 1, args['sort_by'], args['sort_order'], args['cursor'], args['filters']
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Fetch one extra row to learn whether another page exists
+    rows = await fetch_scalars(statement)
+    transactions = rows[:args['page_size']]
+    next_cursor = None
+    if len(rows) > args['page_size']:
+        next_cursor = Transaction.encode_cursor(transactions[-1], args['sort_by'])
+    
+    return jsonify({
+        'transactions': [serialize_transaction(t) for t in transactions],
+        'next_cursor': next_cursor
+    })
+
+@app.route('/api/async/summary')
+@login_required
+async def async_summary():
+    rollups = await fetch_scalars(rollups_statement(current_user.id))
+    summary = summarize_rollups(rollups)
+    return jsonify(dict(
+        summary,
+        category_expenses=calculate_category_expenses_from_rollups(rollups),
+        monthly_expenses=calculate_monthly_expenses_from_rollups(rollups)
+    ))
+
+@app.route('/api/async/budget_status')
+@login_required
+async def async_budget_status():
+    period_starts = budget_period_starts()
+    # Independent reads run concurrently, each on its own connection
+    budgets, spending_rows = await asyncio.gather(
+        fetch_scalars(budgets_statement(current_user.id)),
+        fetch_rows(Transaction.period_spending_statement(current_user.id, period_starts))
+    )
+    spending = Transaction.spending_from_rows(spending_rows, period_starts)
+    return jsonify({'budget_status': calculate_budget_status(budgets, spending)})
+
+@app.route('/api/async/goals')
+@login_required
+async def async_goals():
+    goals = await fetch_scalars(select(SavingGoal).filter_by(user_id=current_user.id).order_by(SavingGoal.deadline))
+    return jsonify({'goals': [serialize_goal(goal) for goal in goals]})
+
+@app.route('/api/async/insights')
+@login_required
+async def async_insights():
+    user_id = current_user.id
+    period_starts = budget_period_starts()
+    rollups, budgets, spending_rows, recurring = await asyncio.gather(
+        fetch_scalars(rollups_statement(user_id)),
+        fetch_scalars(budgets_statement(user_id)),
+        fetch_rows(Transaction.period_spending_statement(user_id, period_starts)),
+        fetch_scalars(select(Transaction).filter_by(user_id=user_id, type='expense', recurring=True).order_by(
+            Transaction.date.desc(), Transaction.id.desc()
+        ).limit(1))
+    )
+    
+    # The recurring reminder is only shown once there is enough history for insights
+    recurring_expense = recurring[0] if recurring and summarize_rollups(rollups)['transaction_count'] >= 3 else None
+    spending = Transaction.spending_from_rows(spending_rows, period_starts)
+    return jsonify({'insights': generate_insights_from_rollups(rollups, budgets, spending, recurring_expense)})
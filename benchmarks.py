@@ -0,0 +1,289 @@
+import datetime
+import gzip
+import json
+import platform
+import re
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import select
+from app import app, db
+from models import User, Transaction, Budget, MonthlyRollup
+from datagen import GENERATOR_PASSWORD, generate_dataset
+from passwords import password_hasher
+from assets import asset_manifest
+from compression import brotli
+import jobs
+import utils
+
+BENCH_SIZES = (1000, 10000, 100000)
+BENCH_SEED = 42
+# A timing must be this much slower, relatively and absolutely, to count as a regression
+REGRESSION_THRESHOLD = 0.25
+NOISE_FLOOR_SECONDS = 0.002
+# Views that change the client's session rather than render data
+SKIPPED_ENDPOINTS = ('logout',)
+# A common word, a prefix, a two-word phrase, a category name and a miss
+SEARCH_QUERIES = ('coffee', 'gro', 'train ticket', 'entertainment', 'zzzz')
+AUTH_BENCH_PREFIX = 'authbench'
+# Logged-out page timed alongside the auth load to show whether cheap requests queue behind hashing
+AUTH_PROBE_PATH = '/'
+# Pages a signed-in user opens; their CDN scripts are outside what this app serves
+TRANSFER_PAGES = ('/dashboard', '/transactions', '/budget', '/goals', '/insights')
+BROWSER_ACCEPT_ENCODING = 'gzip, deflate, br'
+STATIC_URL_PATTERN = re.compile(r'(?:src|href)="(/static/[^"]+)"')
+
+def logged_in_client(user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return client
+
+def median_seconds(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def benchmark_user(size, seed=BENCH_SEED):
+    """The generated benchmark user holding `size` transactions, created on first use"""
+    prefix = f"bench{size}_"
+    user = User.query.filter_by(email=f"{prefix}0@example.invalid").first()
+    if user:
+        return user.id
+    return generate_dataset(1, size, seed, prefix=prefix)[0]
+
+def bench_utils(user_id, repeat):
+    """Median time of each utils function on the user's data"""
+    transactions = Transaction.get_transactions(user_id)
+    budgets = Budget.get_budgets(user_id)
+    rollups = MonthlyRollup.get_rollups(user_id)
+    period_starts = utils.budget_period_starts()
+    spending = utils.calculate_period_spending(transactions, period_starts)
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=365)
+    timeseries_rows = Transaction.get_timeseries(user_id, start, end, 'week')
+
+    cases = {
+        'calculate_category_expenses': lambda: utils.calculate_category_expenses(transactions),
+        'calculate_monthly_expenses': lambda: utils.calculate_monthly_expenses(transactions),
+        'calculate_period_spending': lambda: utils.calculate_period_spending(transactions, period_starts),
+        'calculate_budget_status': lambda: utils.calculate_budget_status(budgets, spending),
+        'generate_insights': lambda: utils.generate_insights(transactions, budgets),
+        'summarize_rollups': lambda: utils.summarize_rollups(rollups),
+        'calculate_category_expenses_from_rollups': lambda: utils.calculate_category_expenses_from_rollups(rollups),
+        'calculate_monthly_expenses_from_rollups': lambda: utils.calculate_monthly_expenses_from_rollups(rollups),
+        'generate_insights_from_rollups': lambda: utils.generate_insights_from_rollups(rollups, budgets, spending),
+        'build_timeseries': lambda: utils.build_timeseries(timeseries_rows, start, end, 'week'),
+        'format_currency': lambda: [utils.format_currency(t.amount) for t in transactions],
+    }
+    return {f"utils.{name}": median_seconds(fn, repeat) for name, fn in cases.items()}
+
+def bench_search(user_id, repeat):
+    """Median time for the first results page of each benchmark query"""
+    return {
+        f"search {query!r}": median_seconds(lambda: Transaction.search_page(user_id, query, 25), repeat)
+        for query in SEARCH_QUERIES
+    }
+
+def benchmarked_routes():
+    """Argument-free GET endpoints defined in routes.py"""
+    paths = []
+    for rule in app.url_map.iter_rules():
+        view = app.view_functions[rule.endpoint]
+        if ('GET' in rule.methods and not rule.arguments and view.__module__ == 'routes'
+                and rule.endpoint not in SKIPPED_ENDPOINTS):
+            paths.append(rule.rule)
+    return sorted(paths)
+
+def bench_routes(user_id, repeat):
+    """Median time of each route through the test client, including streamed bodies"""
+    client = logged_in_client(user_id)
+    results = {}
+    for path in benchmarked_routes():
+        def fetch():
+            response = client.get(path)
+            response.get_data()
+            if response.status_code >= 400:
+                raise RuntimeError(f"GET {path} returned {response.status_code}")
+            response.close()
+        fetch()  # warm caches and precomputed views the way a returning user would
+        results[f"GET {path}"] = median_seconds(fetch, repeat)
+    return results
+
+def run_suite(sizes=BENCH_SIZES, repeat=3, seed=BENCH_SEED):
+    results = {}
+    for size in sizes:
+        user_id = benchmark_user(size, seed)
+        # Let background recomputes from data generation finish so they do not skew timings
+        if jobs.runner is not None:
+            jobs.runner.join()
+        # Requests issued inside the CLI's app context would share its g, logged-in user and session
+        with ThreadPoolExecutor(1) as pool:
+            route_timings = pool.submit(bench_routes, user_id, repeat).result()
+        results[str(size)] = dict(bench_utils(user_id, repeat), **bench_search(user_id, repeat), **route_timings)
+    return {
+        'meta': {
+            'created_at': datetime.datetime.utcnow().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'database': db.engine.url.get_backend_name(),
+            'repeat': repeat,
+            'seed': seed
+        },
+        'results': results
+    }
+
+def decoded_body(response):
+    body = response.get_data()
+    encoding = response.headers.get('Content-Encoding')
+    if encoding == 'gzip':
+        return gzip.decompress(body)
+    if encoding == 'br':
+        return brotli.decompress(body)
+    return body
+
+def page_transfer(client, path, optimized):
+    """Body bytes and requests for a first and a repeat visit to a page by a browser with a cache
+
+    Unoptimized visits stand in for the app before fingerprinting and compression: no
+    Accept-Encoding and plain static URLs, which are revalidated on every visit.
+    """
+    headers = {'Accept-Encoding': BROWSER_ACCEPT_ENCODING} if optimized else {}
+    page = client.get(path, headers=headers)
+    urls = STATIC_URL_PATTERN.findall(decoded_body(page).decode())
+    if not optimized:
+        # Map fingerprinted names back to the files they stand for
+        urls = [
+            f"/static/{asset_manifest.by_url_name[url[len('/static/'):]].filename}"
+            if url[len('/static/'):] in asset_manifest.by_url_name else url
+            for url in urls
+        ]
+    first = {'requests': 1, 'bytes': len(page.get_data())}
+    repeat = {'requests': 1, 'bytes': len(client.get(path, headers=dict(headers, **{
+        'If-None-Match': page.headers.get('ETag', '')
+    })).get_data())}
+    for url in urls:
+        asset = client.get(url, headers=headers)
+        first['requests'] += 1
+        first['bytes'] += len(asset.get_data())
+        # Immutable assets come straight from the browser cache; anything else is revalidated
+        if not asset.cache_control.immutable:
+            revalidation = {'If-None-Match': asset.headers.get('ETag', ''),
+                            'If-Modified-Since': asset.headers.get('Last-Modified', '')}
+            repeat['requests'] += 1
+            repeat['bytes'] += len(client.get(url, headers=dict(headers, **revalidation)).get_data())
+        asset.close()
+    return {'first_visit': first, 'repeat_visit': repeat}
+
+def measure_transfer(user_id, pages=TRANSFER_PAGES):
+    """Response body bytes per page before and after static fingerprinting and compression"""
+    client = logged_in_client(user_id)
+    return {
+        path: {
+            'before': page_transfer(client, path, optimized=False),
+            'after': page_transfer(client, path, optimized=True)
+        }
+        for path in pages
+    }
+
+def auth_bench_emails(users):
+    """Emails of the login benchmark accounts, created on first use"""
+    # The login form's Email() validator rejects reserved domains such as the generator's .invalid
+    emails = [f"{AUTH_BENCH_PREFIX}{index}@example.com" for index in range(users)]
+    existing = set(db.session.scalars(select(User.email).where(User.email.in_(emails))))
+    password_hash = password_hasher.hash(GENERATOR_PASSWORD)
+    for index, email in enumerate(emails):
+        if email not in existing:
+            db.session.add(User(username=f"{AUTH_BENCH_PREFIX}{index}", email=email, password_hash=password_hash))
+    db.session.commit()
+    return emails
+
+def latency_summary(latencies, elapsed):
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'per_second': len(ordered) / elapsed if elapsed > 0 else None,
+        'p50_seconds': ordered[len(ordered) // 2] if ordered else None,
+        'p95_seconds': ordered[int(len(ordered) * 0.95)] if ordered else None
+    }
+
+def run_auth_load(action, requests, concurrency):
+    """Run `action(index)` from `concurrency` threads and time a logged-out page meanwhile"""
+    stop = threading.Event()
+    probe_latencies = []
+
+    def probe():
+        client = app.test_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get(AUTH_PROBE_PATH).close()
+            probe_latencies.append(time.perf_counter() - started)
+            time.sleep(0.01)
+
+    def timed(index):
+        started = time.perf_counter()
+        ok = action(index)
+        return ok, time.perf_counter() - started
+
+    probe_thread = threading.Thread(target=probe, daemon=True)
+    probe_thread.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        outcomes = list(pool.map(timed, range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    probe_thread.join()
+
+    summary = latency_summary([seconds for ok, seconds in outcomes], elapsed)
+    summary['failed'] = sum(1 for ok, seconds in outcomes if not ok)
+    summary['probe'] = latency_summary(probe_latencies, elapsed)
+    return summary
+
+def bench_auth(emails, requests, concurrency):
+    """Login and registration throughput with concurrent clients; expects CSRF checks to be off"""
+    run_id = int(time.time()) % 100000
+
+    def login(index):
+        response = app.test_client().post('/login', data={
+            'email': emails[index % len(emails)], 'password': GENERATOR_PASSWORD
+        })
+        return response.status_code == 302
+
+    def register(index):
+        password = f"{GENERATOR_PASSWORD}{index}"
+        response = app.test_client().post('/register', data={
+            'username': f"r{run_id}_{index}",
+            'email': f"r{run_id}_{index}@example.com",
+            'password': password,
+            'confirm_password': password
+        })
+        return response.status_code == 302
+
+    return {
+        'login': run_auth_load(login, requests, concurrency),
+        'register': run_auth_load(register, requests, concurrency)
+    }
+
+def find_regressions(current, baseline, threshold=REGRESSION_THRESHOLD, floor=NOISE_FLOOR_SECONDS):
+    """(size, name, baseline seconds, current seconds) for every timing that got slower past the threshold"""
+    regressions = []
+    for size, timings in current['results'].items():
+        for name, seconds in timings.items():
+            previous = baseline['results'].get(size, {}).get(name)
+            if previous is None:
+                continue
+            if seconds > previous * (1 + threshold) and seconds - previous > floor:
+                regressions.append((size, name, previous, seconds))
+    return regressions
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+def save_results(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
@@ -0,0 +1,340 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import click
+from sqlalchemy import text
+from app import app, db
+from instrumentation import QueryCounter
+from loaders import DASHBOARD_QUERY_BUDGET
+from importer import IMPORT_CHUNK_SIZE, detect_format, import_transactions, iter_rows
+from recurring import MATERIALIZE_BATCH_SIZE, materialize_recurring
+from datagen import generate_dataset
+from benchmarks import (
+    AUTH_PROBE_PATH, BENCH_SIZES, REGRESSION_THRESHOLD, NOISE_FLOOR_SECONDS,
+    auth_bench_emails, bench_auth, benchmark_user, find_regressions, load_results, logged_in_client,
+    measure_transfer, median_seconds, run_suite, save_results
+)
+from passwords import password_hasher
+from search import rebuild_search_index
+from models import (
+    User, Transaction, Budget, SavingGoal, MonthlyRollup, UserSettings,
+    ensure_columns, ensure_indexes, migrate_compact_storage, storage_sizes
+)
+from storage import type_codes
+
+@app.cli.command('upgrade-schema')
+def upgrade_schema_command():
+    """Create missing tables, columns and indexes in an existing database"""
+    db.create_all()
+    for table_name, rows in migrate_compact_storage():
+        click.echo(f"Migrated {rows} {table_name} rows to compact storage")
+    for column_name in ensure_columns():
+        click.echo(f"Added column {column_name}")
+    for index_name in ensure_indexes():
+        click.echo(f"Ensured index {index_name}")
+    # Totals and insights read the rollups, so an unfilled table would show zeros everywhere
+    if MonthlyRollup.needs_backfill():
+        click.echo(f"Backfilled {MonthlyRollup.rebuild()} monthly rollup rows")
+
+@app.cli.command('migrate-storage')
+@click.option('--vacuum/--no-vacuum', default=True, show_default=True, help='Reclaim the space the old tables used.')
+def migrate_storage_command(vacuum):
+    """Convert float amounts to cents and category/type names to lookup codes"""
+    migrated = migrate_compact_storage(vacuum)
+    if not migrated:
+        click.echo("Already using compact storage")
+    for table_name, rows in migrated:
+        click.echo(f"Migrated {rows} {table_name} rows")
+
+def storage_aggregates(compact, user_id):
+    """Aggregate queries written against whichever layout the database is in"""
+    category, kind = ('category_id', 'type_id') if compact else ('category', 'type')
+    expense = type_codes.code('expense') if compact else 'expense'
+    return {
+        'sum by type': (f'SELECT {kind}, SUM(amount) FROM "transaction" GROUP BY {kind}', {}),
+        'sum by user and category': (
+            f'SELECT user_id, {category}, SUM(amount) FROM "transaction" GROUP BY user_id, {category}', {}
+        ),
+        'user expenses by category': (
+            f'SELECT {category}, SUM(amount) FROM "transaction" '
+            f'WHERE user_id = :user_id AND {kind} = :expense GROUP BY {category}',
+            {'user_id': user_id, 'expense': expense}
+        ),
+    }
+
+@app.cli.command('measure-storage')
+@click.option('--repeat', type=int, default=5, show_default=True)
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help='Also write the measurements as JSON.')
+def measure_storage_command(repeat, output):
+    """Report table and index sizes, aggregate timings and SUM drift for the current layout"""
+    columns = {column['name'] for column in db.inspect(db.engine).get_columns('transaction')}
+    compact = 'category_id' in columns
+    user_id = db.session.execute(text('SELECT MAX(user_id) FROM "transaction"')).scalar() or 0
+    sizes = storage_sizes()
+    timings = {
+        name: median_seconds(lambda: db.session.execute(text(sql), params).all(), repeat)
+        for name, (sql, params) in storage_aggregates(compact, user_id).items()
+    }
+    # Float sums drift from the exact total of the cent values they were entered as; integer sums cannot
+    drift = 0.0
+    if not compact:
+        total, exact_cents = db.session.execute(text(
+            'SELECT SUM(amount), SUM(CAST(ROUND(ROUND(amount, 2) * 100) AS INTEGER)) FROM "transaction"'
+        )).one()
+        drift = (total or 0.0) - (exact_cents or 0) / 100
+    results = {
+        'layout': 'compact' if compact else 'legacy',
+        'sizes': sizes,
+        'aggregate_seconds': timings,
+        'sum_drift': drift,
+    }
+    for name in ('transaction', 'monthly_rollup', 'budget', 'saving_goal'):
+        table_bytes = sizes.get(name, 0)
+        index_bytes = sum(
+            size for index_name, size in sizes.items()
+            if index_name.startswith((f"ix_{name}_", f"sqlite_autoindex_{name}_"))
+        )
+        click.echo(f"{name:16} table {table_bytes / 1024:10.1f} KiB  indexes {index_bytes / 1024:10.1f} KiB")
+    for name, seconds in timings.items():
+        click.echo(f"{name:28} {seconds * 1000:8.2f} ms")
+    click.echo(f"SUM(amount) drift: {drift!r}")
+    if output:
+        with open(output, 'w') as stream:
+            json.dump(results, stream, indent=2)
+
+@app.cli.command('ensure-indexes')
+def ensure_indexes_command():
+    """Add missing indexes to an existing database"""
+    for index_name in ensure_indexes():
+        click.echo(f"Ensured index {index_name}")
+
+def explain_query_plan(query):
+    """Return the SQLite query plan details for a SQLAlchemy query"""
+    statement = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {statement}")).fetchall()
+    return [row[-1] for row in rows]
+
+def hot_queries(user_id=0):
+    """The per-user queries the pages run on every view"""
+    return {
+        'transactions by date': Transaction.query.filter_by(user_id=user_id)
+            .order_by(Transaction.date.desc(), Transaction.id.desc()),
+        'transactions by amount': Transaction.query.filter_by(user_id=user_id)
+            .order_by(Transaction.amount.desc()),
+        'transactions by category': Transaction.query.filter_by(user_id=user_id)
+            .order_by(Transaction.category.desc()),
+        'category spend since date': Transaction.query.filter_by(
+            user_id=user_id, type='expense', category='food'
+        ).filter(Transaction.date >= '2000-01-01'),
+        'budget upsert lookup': Budget.query.filter_by(
+            user_id=user_id, category='food', period='monthly'
+        ),
+        'saving goals': SavingGoal.query.filter_by(user_id=user_id),
+    }
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Fail if any hot query falls back to a full table scan"""
+    failures = 0
+    for name, query in hot_queries().items():
+        plan = explain_query_plan(query)
+        full_scan = any(detail.startswith('SCAN') and 'USING' not in detail for detail in plan)
+        failures += full_scan
+        click.echo(f"{'FULL SCAN' if full_scan else 'ok':9} {name}: {'; '.join(plan)}")
+    if failures:
+        raise SystemExit(1)
+
+@app.cli.command('rebuild-rollups')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user\'s rollups.')
+def rebuild_rollups_command(user_id):
+    """Backfill the monthly rollup table from transactions"""
+    rows = MonthlyRollup.rebuild(user_id)
+    click.echo(f"Rebuilt {rows} monthly rollup rows")
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Refill the transaction search index from the transaction table"""
+    rows = rebuild_search_index()
+    click.echo(f"Indexed {rows} transactions")
+
+@app.cli.command('materialize-recurring')
+@click.option('--through', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='Last date to create occurrences for. Defaults to today.')
+@click.option('--user-id', type=int, default=None, help='Only materialize this user\'s series.')
+@click.option('--batch-size', type=int, default=MATERIALIZE_BATCH_SIZE, show_default=True, help='Series per committed batch.')
+def materialize_recurring_command(through, user_id, batch_size):
+    """Create the transactions recurring series owe up to a date; safe to run repeatedly"""
+    report = materialize_recurring(through.date() if through else None, user_id, batch_size)
+    click.echo(
+        f"Created {report['created']} transactions and linked {report['linked']} existing ones "
+        f"from {report['series']} series in {report['batches']} batches "
+        f"({report['conflicts']} conflicting series skipped) in {report['seconds']}s"
+    )
+
+@app.cli.command('import-transactions')
+@click.argument('user_id', type=int)
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'json']), default=None, help='Defaults to the file extension.')
+@click.option('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, show_default=True, help='Rows per batched insert.')
+def import_transactions_command(user_id, path, file_format, chunk_size):
+    """Bulk import an export_csv or export_data file for a user"""
+    if not db.session.get(User, user_id):
+        raise click.ClickException(f"No user with id {user_id}")
+    with open(path, 'rb') as stream:
+        report = import_transactions(user_id, iter_rows(stream, detect_format(path, file_format)), chunk_size)
+    click.echo(json.dumps(report, indent=2))
+
+@app.cli.command('check-dashboard-queries')
+@click.argument('user_id', type=int)
+@click.option('--budget', type=int, default=DASHBOARD_QUERY_BUDGET, show_default=True)
+def check_dashboard_queries_command(user_id, budget):
+    """Fail if rendering the dashboard for a user runs more queries than its budget"""
+    user = db.session.get(User, user_id)
+    if not user:
+        raise click.ClickException(f"No user with id {user_id}")
+
+    # Measure the cold path: settings exist (login creates them) but are not cached yet
+    UserSettings.get_settings(user_id)
+    UserSettings.invalidate_cached_settings(user_id)
+    client = logged_in_client(user_id)
+
+    # A real request, so the flask-login user load is counted too
+    with QueryCounter(db.engine) as counter:
+        client.get('/dashboard')
+
+    for statement in counter.statements:
+        click.echo(' '.join(statement.split())[:120])
+    click.echo(f"{counter.count} queries (budget {budget})")
+    if counter.count > budget:
+        raise SystemExit(1)
+
+# (name, current sync view, async read API endpoint serving the same data)
+ASYNC_LOAD_TEST_PAIRS = (
+    ('transactions', '/api/transactions', '/api/async/transactions'),
+    ('summary', '/dashboard', '/api/async/summary'),
+    ('budget_status', '/budget', '/api/async/budget_status'),
+    ('goals', '/goals', '/api/async/goals'),
+    ('insights', '/insights', '/api/async/insights'),
+)
+
+@app.cli.command('load-test-async')
+@click.argument('user_id', type=int)
+@click.option('--concurrency', type=int, default=8, show_default=True, help='Simultaneous clients.')
+@click.option('--requests', 'request_count', type=int, default=200, show_default=True, help='Requests per endpoint.')
+def load_test_async_command(user_id, concurrency, request_count):
+    """Compare concurrent throughput of the sync views and the async read API for one user"""
+    if 'async_transactions' not in app.view_functions:
+        raise click.ClickException('The async read API is disabled; install aiosqlite and asgiref')
+    if not db.session.get(User, user_id):
+        raise click.ClickException(f"No user with id {user_id}")
+
+    def requests_per_second(path):
+        # Each thread drives its own client, like concurrent users against a threaded server
+        clients = [logged_in_client(user_id) for _ in range(concurrency)]
+        counts = [request_count // concurrency + (i < request_count % concurrency) for i in range(concurrency)]
+
+        def run(client, count):
+            failures = 0
+            for _ in range(count):
+                response = client.get(path)
+                failures += response.status_code != 200
+                response.close()
+            return failures
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            failures = sum(pool.map(run, clients, counts))
+        elapsed = time.perf_counter() - started
+        return request_count / elapsed, failures
+
+    for name, sync_path, async_path in ASYNC_LOAD_TEST_PAIRS:
+        sync_rps, sync_failures = requests_per_second(sync_path)
+        async_rps, async_failures = requests_per_second(async_path)
+        click.echo(
+            f"{name:<14} sync {sync_rps:8.1f} req/s  async {async_rps:8.1f} req/s  "
+            f"({async_rps / sync_rps:.2f}x, {sync_failures + async_failures} failed)"
+        )
+
+@app.cli.command('generate-data')
+@click.option('--users', type=int, default=10, show_default=True)
+@click.option('--transactions', type=int, default=1000, show_default=True, help='Transactions per user.')
+@click.option('--seed', type=int, default=42, show_default=True)
+@click.option('--prefix', default='synthetic', show_default=True, help='Username and email prefix.')
+def generate_data_command(users, transactions, seed, prefix):
+    """Create deterministic users with transactions, budgets and goals"""
+    started = time.perf_counter()
+    user_ids = generate_dataset(users, transactions, seed, prefix=prefix)
+    click.echo(f"Created {len(user_ids)} users with {transactions} transactions each in {time.perf_counter() - started:.1f}s")
+
+@app.cli.command('bench')
+@click.option('--sizes', default=','.join(map(str, BENCH_SIZES)), show_default=True, help='Comma-separated transaction counts.')
+@click.option('--repeat', type=int, default=3, show_default=True)
+@click.option('--output', type=click.Path(dir_okay=False), default='bench_results.json', show_default=True)
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), default=None, help='Earlier results to compare against.')
+@click.option('--threshold', type=float, default=REGRESSION_THRESHOLD, show_default=True, help='Allowed relative slowdown.')
+def bench_command(sizes, repeat, output, baseline, threshold):
+    """Time utils functions and routes at several data sizes; fail on regressions against a baseline"""
+    # Benchmark users are generated into the configured database, so point DATABASE_URL at a scratch copy
+    results = run_suite([int(size) for size in sizes.split(',')], repeat)
+    save_results(results, output)
+    for size, timings in results['results'].items():
+        for name, seconds in sorted(timings.items()):
+            click.echo(f"{size:>7} {name:<52} {seconds * 1000:10.2f}ms")
+    click.echo(f"Wrote {output}")
+
+    if baseline:
+        regressions = find_regressions(results, load_results(baseline), threshold, NOISE_FLOOR_SECONDS)
+        for size, name, previous, current in regressions:
+            click.echo(f"REGRESSION {size} {name}: {previous * 1000:.2f}ms -> {current * 1000:.2f}ms")
+        if regressions:
+            raise SystemExit(1)
+        click.echo(f"No regressions past {threshold:.0%} against {baseline}")
+
+
+@app.cli.command('bench-auth')
+@click.option('--users', type=int, default=20, show_default=True, help='Accounts the logins rotate through.')
+@click.option('--concurrency', type=int, default=16, show_default=True, help='Simultaneous clients.')
+@click.option('--requests', 'request_count', type=int, default=200, show_default=True, help='Logins and registrations each.')
+@click.option('--mode', type=click.Choice(['inline', 'process', 'both']), default='both', show_default=True)
+def bench_auth_command(users, concurrency, request_count, mode):
+    """Login and registration throughput under concurrent load, with hashing inline or in the process pool"""
+    # The benchmark posts forms directly and creates accounts, so point DATABASE_URL at a scratch copy
+    app.config['WTF_CSRF_ENABLED'] = False
+    emails = auth_bench_emails(users)
+    configured_mode = password_hasher.mode
+    click.echo(f"bcrypt work factor {password_hasher.rounds}, {password_hasher.workers} pool workers")
+    try:
+        for hash_mode in (('inline', 'process') if mode == 'both' else (mode,)):
+            password_hasher.mode = hash_mode
+            with ThreadPoolExecutor(1) as pool:
+                results = pool.submit(bench_auth, emails, request_count, concurrency).result()
+            for action, summary in results.items():
+                probe = summary['probe']
+                click.echo(
+                    f"{hash_mode:<8} {action:<9} {summary['per_second']:7.1f} req/s  "
+                    f"p50 {summary['p50_seconds'] * 1000:7.1f}ms  p95 {summary['p95_seconds'] * 1000:7.1f}ms  "
+                    f"({summary['failed']} failed)  {AUTH_PROBE_PATH} p50 {probe['p50_seconds'] * 1000:6.1f}ms "
+                    f"p95 {probe['p95_seconds'] * 1000:6.1f}ms"
+                )
+    finally:
+        password_hasher.mode = configured_mode
+
+@app.cli.command('measure-transfer')
+@click.option('--size', type=int, default=BENCH_SIZES[1], show_default=True, help='Transactions of the measured user.')
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help='Also write the measurements as JSON.')
+def measure_transfer_command(size, output):
+    """Bytes and requests per page before and after static fingerprinting and response compression"""
+    # Generates a benchmark user on first use, so point DATABASE_URL at a scratch copy
+    user_id = benchmark_user(size)
+    with ThreadPoolExecutor(1) as pool:
+        results = pool.submit(measure_transfer, user_id).result()
+    click.echo(f"{'page':<14} {'':6} {'first visit':>22} {'repeat visit':>22}")
+    for path, modes in results.items():
+        for mode, visits in modes.items():
+            first, repeat = visits['first_visit'], visits['repeat_visit']
+            click.echo(
+                f"{path:<14} {mode:6} {first['bytes']:>10} B {first['requests']:>3} req "
+                f"{repeat['bytes']:>10} B {repeat['requests']:>3} req"
+            )
+    if output:
+        with open(output, 'w') as stream:
+            json.dump(results, stream, indent=2)
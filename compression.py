@@ -0,0 +1,60 @@
+import gzip
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Below this the encoding overhead and CPU outweigh the bytes saved
+COMPRESSION_MIN_BYTES = 1024
+COMPRESSIBLE_MIMETYPES = (
+    'text/html', 'text/css', 'text/csv', 'text/javascript', 'text/plain',
+    'application/javascript', 'application/json', 'image/svg+xml'
+)
+
+def accepted_encoding(available=None):
+    """The best of the available encodings the client accepts, or None for identity"""
+    if available is None:
+        available = ('br', 'gzip') if brotli is not None else ('gzip',)
+    offered = [encoding for encoding in ('br', 'gzip') if encoding in available]
+    return request.accept_encodings.best_match(offered)
+
+def compress_body(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=current_app.config.get('BROTLI_QUALITY', BROTLI_QUALITY))
+    # A fixed mtime keeps the output identical for identical bodies
+    return gzip.compress(body, compresslevel=current_app.config.get('GZIP_LEVEL', GZIP_LEVEL), mtime=0)
+
+def compress_response(response):
+    """Encode a buffered 200 response for the client when it is large enough to be worth it"""
+    if response.status_code != 200 or response.is_streamed or response.direct_passthrough:
+        return response
+    if 'Content-Encoding' in response.headers:
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < current_app.config.get('COMPRESSION_MIN_BYTES', COMPRESSION_MIN_BYTES):
+        return response
+    encoding = accepted_encoding()
+    if encoding is None:
+        return response
+    response.set_data(compress_body(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # Encodings of one representation share a weak validator, which If-None-Match still matches
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def init_compression(app):
+    """Compress buffered text responses after every view, so page caches keep unencoded bodies"""
+    app.config.setdefault('COMPRESSION_MIN_BYTES', COMPRESSION_MIN_BYTES)
+
+    @app.after_request
+    def compress_dynamic_response(response):
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        return compress_response(response)
@@ -0,0 +1,140 @@
+import datetime
+import math
+import random
+from app import db
+from passwords import password_hasher
+from models import User, Transaction, Budget, SavingGoal, UserSettings
+from utils import occurrences_between
+
+GENERATOR_PASSWORD = 'password'
+INSERT_CHUNK_SIZE = 5000
+
+# Variable spending: (category, share of expense rows, median amount, log-normal spread)
+SPENDING_PROFILE = (
+    ('food', 0.38, 18.0, 0.7),
+    ('transportation', 0.16, 25.0, 0.8),
+    ('entertainment', 0.12, 30.0, 0.9),
+    ('personal', 0.11, 35.0, 0.9),
+    ('healthcare', 0.05, 60.0, 1.0),
+    ('education', 0.03, 120.0, 0.8),
+    ('housing', 0.04, 90.0, 1.0),
+    ('utilities', 0.03, 45.0, 0.5),
+    ('other', 0.08, 40.0, 1.1),
+)
+DESCRIPTIONS = {
+    'food': ('Groceries', 'Coffee', 'Lunch', 'Restaurant', 'Bakery'),
+    'transportation': ('Fuel', 'Bus pass', 'Taxi', 'Parking', 'Train ticket'),
+    'entertainment': ('Cinema', 'Concert', 'Books', 'Games', 'Museum'),
+    'personal': ('Clothing', 'Haircut', 'Pharmacy', 'Gift'),
+    'healthcare': ('Doctor visit', 'Dentist', 'Prescription'),
+    'education': ('Course', 'Textbooks', 'Workshop'),
+    'housing': ('Repairs', 'Furniture', 'Cleaning supplies'),
+    'utilities': ('Water', 'Phone top-up'),
+    'other': ('Bank fee', 'Donation', 'Miscellaneous'),
+}
+# Fixed bills and pay: (description, category, type, amount, interval)
+RECURRING_PROFILE = (
+    ('Salary', 'income', 'income', 2400.0, 'biweekly'),
+    ('Rent', 'housing', 'expense', 1350.0, 'monthly'),
+    ('Electricity', 'utilities', 'expense', 85.0, 'monthly'),
+    ('Internet', 'utilities', 'expense', 55.0, 'monthly'),
+    ('Streaming subscription', 'entertainment', 'expense', 15.0, 'monthly'),
+    ('Gym membership', 'personal', 'expense', 40.0, 'monthly'),
+    ('Car insurance', 'transportation', 'expense', 420.0, 'quarterly'),
+    ('Domain renewal', 'other', 'expense', 20.0, 'yearly'),
+)
+BUDGET_PROFILE = (('food', 450.0, 'monthly'), ('entertainment', 40.0, 'weekly'),
+                  ('transportation', 300.0, 'monthly'), ('personal', 2500.0, 'yearly'))
+
+def recurring_rows(rng, start, end):
+    """Past occurrences of each fixed bill; the latest is left as the live recurring series"""
+    rows = []
+    for description, category, transaction_type, amount, interval in RECURRING_PROFILE:
+        # Each user's bills differ a little, and each starts on its own day
+        amount = round(amount * rng.uniform(0.8, 1.25), 2)
+        anchor = start + datetime.timedelta(days=rng.randint(0, 27))
+        dates = [anchor] + occurrences_between(anchor, interval, anchor, end)
+        for i, date in enumerate(dates):
+            live = i == len(dates) - 1
+            rows.append({
+                'description': description,
+                'amount': amount,
+                'category': category,
+                'date': date,
+                'type': transaction_type,
+                'recurring': live,
+                'recurring_interval': interval if live else None
+            })
+    return rows
+
+def variable_rows(rng, count, start, end):
+    categories = [profile[0] for profile in SPENDING_PROFILE]
+    weights = [profile[1] for profile in SPENDING_PROFILE]
+    profiles = {profile[0]: profile for profile in SPENDING_PROFILE}
+    span = (end - start).days
+    rows = []
+    for _ in range(count):
+        # Occasional side income among the everyday spending
+        if rng.random() < 0.04:
+            category, transaction_type, description = 'income', 'income', 'Freelance payment'
+            amount = rng.lognormvariate(math.log(300.0), 0.6)
+        else:
+            category = rng.choices(categories, weights)[0]
+            _, _, median, spread = profiles[category]
+            transaction_type, description = 'expense', rng.choice(DESCRIPTIONS[category])
+            amount = rng.lognormvariate(math.log(median), spread)
+        # Weekends see more spending
+        date = start + datetime.timedelta(days=rng.randint(0, span))
+        if date.weekday() < 5 and rng.random() < 0.25:
+            date = min(date + datetime.timedelta(days=5 - date.weekday()), end)
+        rows.append({
+            'description': description,
+            'amount': round(max(amount, 0.5), 2),
+            'category': category,
+            'date': date,
+            'type': transaction_type,
+            'recurring': False,
+            'recurring_interval': None
+        })
+    return rows
+
+def synthetic_rows(count, seed=42, end_date=None):
+    """`count` deterministic transaction rows for one user, newest first"""
+    rng = random.Random(seed)
+    end = end_date or datetime.date.today()
+    # Roughly 40 rows a month of history, between one and five years
+    months = min(max(count // 40, 12), 60)
+    start = end - datetime.timedelta(days=months * 30)
+
+    rows = recurring_rows(rng, start, end)[:count]
+    rows += variable_rows(rng, count - len(rows), start, end)
+    rows.sort(key=lambda row: row['date'], reverse=True)
+    return rows
+
+def generate_dataset(users, transactions_per_user, seed=42, end_date=None, prefix='synthetic'):
+    """Create users with transactions, budgets, goals and settings; the same arguments give the same data"""
+    end = end_date or datetime.date.today()
+    # One hash for everyone: bcrypt is deliberately slow and the password is not the point here
+    password_hash = password_hasher.hash(GENERATOR_PASSWORD)
+    user_ids = []
+    for index in range(users):
+        user = User(username=f"{prefix}{index}", email=f"{prefix}{index}@example.invalid", password_hash=password_hash)
+        db.session.add(user)
+        db.session.commit()
+
+        user_seed = seed * 1000003 + index
+        rows = synthetic_rows(transactions_per_user, user_seed, end)
+        for offset in range(0, len(rows), INSERT_CHUNK_SIZE):
+            Transaction.bulk_add_transactions(user.id, rows[offset:offset + INSERT_CHUNK_SIZE])
+
+        rng = random.Random(user_seed)
+        for category, limit_amount, period in BUDGET_PROFILE:
+            Budget.add_budget(user.id, category, round(limit_amount * rng.uniform(0.7, 1.3), 2), period)
+        for name, target in (('Emergency fund', 5000.0), ('Holiday', 1800.0), ('New laptop', 1500.0))[:rng.randint(1, 3)]:
+            SavingGoal.add_goal(
+                user.id, name, target, end + datetime.timedelta(days=rng.randint(30, 540)),
+                current_amount=round(target * rng.uniform(0, 0.9), 2)
+            )
+        UserSettings.get_settings(user.id)
+        user_ids.append(user.id)
+    return user_ids
@@ -1,35 +1,57 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SubmitField, FloatField, SelectField, DateField, BooleanField, HiddenField
-from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError
+from wtforms.validators import DataRequired, Email, EqualTo, Length, NumberRange, ValidationError
 from app import db
-from models import User
+from models import MAX_CURSOR_AMOUNT, User
 import datetime
 
+# Amounts are stored as integer cents, which cannot hold values beyond this
+AMOUNT_RANGE = NumberRange(min=-MAX_CURSOR_AMOUNT, max=MAX_CURSOR_AMOUNT)
+# bcrypt only reads the first 72 bytes of a password, and bcrypt 5 raises for anything longer
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+class MaxBytes:
+    """Like Length(max=...), but counts UTF-8 bytes rather than characters"""
+
+    def __init__(self, max, message=None):
+        self.max = max
+        self.message = message
+
+    def __call__(self, form, field):
+        if field.data and len(field.data.encode('utf-8')) > self.max:
+            raise ValidationError(self.message or f"Field must be at most {self.max} bytes long.")
+
+PASSWORD_BYTES = MaxBytes(
+    BCRYPT_MAX_PASSWORD_BYTES,
+    f"Password must be at most {BCRYPT_MAX_PASSWORD_BYTES} bytes (fewer characters if it uses accents or symbols)."
+)
+
 class RegistrationForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired(), Length(min=3, max=20)])
     email = StringField('Email', validators=[DataRequired(), Email()])
-    password = PasswordField('Password', validators=[DataRequired(), Length(min=6)])
+    password = PasswordField('Password', validators=[DataRequired(), Length(min=6), PASSWORD_BYTES])
     confirm_password = PasswordField('Confirm Password', validators=[DataRequired(), EqualTo('password')])
     submit = SubmitField('Sign Up')
     
-    def validate_username(self, username):
-        user = User.query.filter_by(username=username.data).first()
-        if user:
-            raise ValidationError('Username is already taken. Please choose a different one.')
-    
-    def validate_email(self, email):
-        user = User.query.filter_by(email=email.data).first()
-        if user:
-            raise ValidationError('Email is already registered. Please use a different one.')
+    def validate(self, extra_validators=None):
+        if not super().validate(extra_validators):
+            return False
+        # One lookup for both unique fields instead of a query per field validator
+        taken = User.taken_fields(self.username.data, self.email.data)
+        if 'username' in taken:
+            self.username.errors.append('Username is already taken. Please choose a different one.')
+        if 'email' in taken:
+            self.email.errors.append('Email is already registered. Please use a different one.')
+        return not taken
 
 class LoginForm(FlaskForm):
     email = StringField('Email', validators=[DataRequired(), Email()])
-    password = PasswordField('Password', validators=[DataRequired()])
+    password = PasswordField('Password', validators=[DataRequired(), PASSWORD_BYTES])
     submit = SubmitField('Login')
 
 class TransactionForm(FlaskForm):
     description = StringField('Description', validators=[DataRequired()])
-    amount = FloatField('Amount', validators=[DataRequired()])
+    amount = FloatField('Amount', validators=[DataRequired(), AMOUNT_RANGE])
     category = SelectField('Category', choices=[
         ('housing', 'Housing'),
         ('transportation', 'Transportation'),
@@ -58,14 +80,14 @@ class TransactionForm(FlaskForm):
 
 class GoalForm(FlaskForm):
     name = StringField('Goal Name', validators=[DataRequired()])
-    target_amount = FloatField('Target Amount', validators=[DataRequired()])
-    current_amount = FloatField('Current Amount Saved', default=0.0)
+    target_amount = FloatField('Target Amount', validators=[DataRequired(), AMOUNT_RANGE])
+    current_amount = FloatField('Current Amount Saved', default=0.0, validators=[AMOUNT_RANGE])
     deadline = DateField('Goal Deadline', validators=[DataRequired()])
     submit = SubmitField('Add Goal')
 
 class UpdateGoalForm(FlaskForm):
     goal_id = HiddenField('Goal ID')
-    current_amount = FloatField('Current Amount Saved', validators=[DataRequired()])
+    current_amount = FloatField('Current Amount Saved', validators=[DataRequired(), AMOUNT_RANGE])
     submit = SubmitField('Update Progress')
 
 class BudgetForm(FlaskForm):
@@ -81,7 +103,7 @@ class BudgetForm(FlaskForm):
         ('investments', 'Investments'),
         ('other', 'Other')
     ], validators=[DataRequired()])
-    limit_amount = FloatField('Budget Limit', validators=[DataRequired()])
+    limit_amount = FloatField('Budget Limit', validators=[DataRequired(), AMOUNT_RANGE])
     period = SelectField('Budget Period', choices=[
         ('weekly', 'Weekly'),
         ('monthly', 'Monthly'),
@@ -0,0 +1,55 @@
+import datetime
+import hashlib
+from functools import wraps
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from cache import LRUCache
+
+page_cache = LRUCache(maxsize=256, ttl=600)
+
+def data_etag():
+    """ETag for the current page, derived from the user's data version"""
+    parts = [
+        current_user.id,
+        current_user.data_version,
+        request.endpoint,
+        request.full_path,
+        # Budget periods and "this month" insights roll over with the date
+        datetime.date.today().isoformat(),
+        # Pending flash messages change what a page would render
+        session.get('_flashes', ''),
+        current_app.config.get('ETAG_SALT', '')
+    ]
+    return hashlib.sha1(':'.join(map(str, parts)).encode()).hexdigest()
+
+def conditional_view(view):
+    """Answer If-None-Match with 304 and optionally serve cached pages until the user's data changes
+
+    The data version comes from the user row flask-login already loaded, so a 304 runs no
+    further queries. Cached views must not render per-session values such as CSRF tokens.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # Form posts always render fresh
+        if request.method != 'GET' or not current_user.is_authenticated:
+            return view(*args, **kwargs)
+
+        etag = data_etag()
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            cache_enabled = current_app.config.get('PAGE_CACHE_ENABLED', False)
+            cached = page_cache.get(etag) if cache_enabled else None
+            if cached is not None:
+                body, mimetype = cached
+                response = current_app.response_class(body, mimetype=mimetype)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if cache_enabled and response.status_code == 200 and not response.is_streamed and not session.get('_flashes'):
+                    page_cache.set(etag, (response.get_data(), response.mimetype))
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    return wrapper
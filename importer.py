@@ -0,0 +1,191 @@
+import csv
+import datetime
+import io
+import json
+import math
+import time
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from models import MAX_CURSOR_AMOUNT, Transaction
+from utils import RECURRING_INTERVALS
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+TRANSACTION_TYPES = ('income', 'expense')
+
+class ImportRowError(ValueError):
+    pass
+
+def iter_csv_rows(stream):
+    """Yield transaction dicts from a CSV in the export_csv layout"""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for row in reader:
+        yield {
+            'date': row.get('Date'),
+            'description': row.get('Description'),
+            'category': row.get('Category'),
+            'type': row.get('Type'),
+            'amount': row.get('Amount'),
+            'recurring': row.get('Recurring'),
+            'recurring_interval': row.get('Recurring Interval')
+        }
+
+def iter_json_rows(stream, key='transactions', chunk_size=65536):
+    """Yield the items of the top-level `key` array of an export_data file without loading it whole"""
+    decoder = json.JSONDecoder()
+    reader = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    buffer = ''
+    position = 0
+    in_array = False
+    eof = False
+
+    while True:
+        if not in_array:
+            marker = buffer.find(f'"{key}"')
+            bracket = buffer.find('[', marker) if marker != -1 else -1
+            if bracket != -1:
+                position = bracket + 1
+                in_array = True
+                continue
+        else:
+            # Skip separators between items
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer):
+                if buffer[position] == ']':
+                    return
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise ImportRowError('Truncated JSON array')
+                else:
+                    yield item
+                    position = end
+                    continue
+            # Drop consumed text so the buffer stays one chunk or so in size
+            buffer = buffer[position:]
+            position = 0
+
+        if eof:
+            if not in_array:
+                raise ImportRowError(f'No "{key}" array found')
+            raise ImportRowError('Truncated JSON array')
+        chunk = reader.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in ('yes', 'true', '1', 'y')
+
+def validate_row(row):
+    """Return the column values for one transaction or raise ImportRowError"""
+    try:
+        date = row.get('date')
+        date = date if isinstance(date, datetime.date) else datetime.date.fromisoformat(str(date).strip())
+    except (TypeError, ValueError):
+        raise ImportRowError(f"Invalid date: {row.get('date')!r}")
+
+    description = str(row.get('description') or '').strip()
+    if not description or len(description) > 100:
+        raise ImportRowError('Description must be 1-100 characters')
+
+    category = str(row.get('category') or '').strip()
+    if not category or len(category) > 50:
+        raise ImportRowError('Category must be 1-50 characters')
+
+    transaction_type = str(row.get('type') or '').strip().lower()
+    if transaction_type not in TRANSACTION_TYPES:
+        raise ImportRowError(f"Invalid type: {row.get('type')!r}")
+
+    try:
+        amount = float(row.get('amount'))
+    except (TypeError, ValueError):
+        raise ImportRowError(f"Invalid amount: {row.get('amount')!r}")
+    if not math.isfinite(amount):
+        raise ImportRowError(f"Invalid amount: {row.get('amount')!r}")
+    if abs(amount) > MAX_CURSOR_AMOUNT:
+        raise ImportRowError(f"Amount out of range: {row.get('amount')!r}")
+
+    recurring = parse_bool(row.get('recurring'))
+    recurring_interval = row.get('recurring_interval') or None
+    if recurring_interval and recurring_interval not in RECURRING_INTERVALS:
+        raise ImportRowError(f"Invalid recurring interval: {recurring_interval!r}")
+
+    return {
+        'date': date,
+        'description': description,
+        'category': category,
+        'type': transaction_type,
+        'amount': amount,
+        'recurring': recurring,
+        'recurring_interval': recurring_interval if recurring else None
+    }
+
+def import_transactions(user_id, rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """Validate rows as they stream in and insert them in batches of `chunk_size`"""
+    started = time.perf_counter()
+    imported = 0
+    error_count = 0
+    errors = []
+    chunk = []
+
+    def record_error(row_number, message):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'row': row_number, 'error': message})
+
+    def store(chunk):
+        # chunk holds (row number, values); a failed batch is retried row by row so only the bad rows are lost
+        try:
+            return Transaction.bulk_add_transactions(user_id, [values for _, values in chunk])
+        except SQLAlchemyError:
+            db.session.rollback()
+        stored = 0
+        for row_number, values in chunk:
+            try:
+                stored += Transaction.bulk_add_transactions(user_id, [values])
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                record_error(row_number, f"Could not be stored: {getattr(e, 'orig', None) or e}")
+        return stored
+
+    try:
+        for row_number, row in enumerate(rows, 1):
+            try:
+                if not isinstance(row, dict):
+                    raise ImportRowError('Row is not an object')
+                chunk.append((row_number, validate_row(row)))
+            except ImportRowError as e:
+                record_error(row_number, str(e))
+                continue
+
+            if len(chunk) >= chunk_size:
+                imported += store(chunk)
+                chunk = []
+    except (ImportRowError, csv.Error, UnicodeDecodeError) as e:
+        # The file itself is malformed; keep what was imported so far
+        record_error(None, str(e))
+
+    if chunk:
+        imported += store(chunk)
+
+    elapsed = time.perf_counter() - started
+    return {
+        'imported': imported,
+        'error_count': error_count,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(imported / elapsed, 1) if elapsed > 0 else None
+    }
+
+def detect_format(filename, requested=None):
+    if requested in ('csv', 'json'):
+        return requested
+    return 'json' if (filename or '').lower().endswith('.json') else 'csv'
+
+def iter_rows(stream, file_format):
+    return iter_json_rows(stream) if file_format == 'json' else iter_csv_rows(stream)
@@ -0,0 +1,146 @@
+import datetime
+import json
+import sqlite3
+import threading
+import time
+from cache import LRUCache
+
+class MemoryBackend:
+    """Per-process LRU; fine for a single worker"""
+
+    def __init__(self, maxsize=4096, ttl=86400):
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.evictions = 0
+
+    def get(self, user_id):
+        return self.cache.get(user_id)
+
+    def set(self, user_id, entry):
+        self.cache.set(user_id, entry)
+
+    def delete(self, user_id):
+        self.cache.invalidate(user_id)
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        stats = self.cache.stats()
+        return {'size': stats['size'], 'evictions': stats['evictions']}
+
+class SQLiteBackend:
+    """Shared SQLite file so every worker on the host sees the same entries and invalidations"""
+
+    def __init__(self, path, maxsize=100000):
+        self.path = path
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS insights_cache ("
+                "user_id INTEGER PRIMARY KEY, entry TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def get(self, user_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT entry FROM insights_cache WHERE user_id = ?", (user_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, user_id, entry):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO insights_cache (user_id, entry, updated_at) VALUES (?, ?, ?)",
+                (user_id, json.dumps(entry), time.time())
+            )
+            # Keep the table bounded by dropping the least recently written entries
+            overflow = conn.execute("SELECT COUNT(*) FROM insights_cache").fetchone()[0] - self.maxsize
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM insights_cache WHERE user_id IN "
+                    "(SELECT user_id FROM insights_cache ORDER BY updated_at LIMIT ?)", (overflow,)
+                )
+                with self._lock:
+                    self.evictions += overflow
+
+    def delete(self, user_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM insights_cache WHERE user_id = ?", (user_id,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM insights_cache")
+
+    def stats(self):
+        with self._connect() as conn:
+            size = conn.execute("SELECT COUNT(*) FROM insights_cache").fetchone()[0]
+        return {'size': size, 'evictions': self.evictions}
+
+class InsightsCache:
+    """Memoizes generated insights per user, valid only for the data_version they were computed from"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+        self.recompute_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, user_id, data_version, compute):
+        # Every write bumps data_version, so an entry computed before a write can never be served after it,
+        # even when it was stored after the invalidation; entries also expire at midnight because
+        # insights compare against "this month"
+        today = datetime.date.today().isoformat()
+        entry = self.backend.get(user_id)
+        if entry and entry.get('data_version') == data_version and entry['computed_on'] == today:
+            with self._lock:
+                self.hits += 1
+            return entry['insights']
+
+        started = time.perf_counter()
+        insights = compute()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.misses += 1
+            self.recompute_seconds += elapsed
+
+        if data_version is not None:
+            self.backend.set(user_id, {'data_version': data_version, 'computed_on': today, 'insights': insights})
+        return insights
+
+    def invalidate(self, user_id):
+        self.backend.delete(user_id)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        backend_stats = self.backend.stats()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': backend_stats['evictions'],
+                'size': backend_stats['size'],
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'recompute_seconds': self.recompute_seconds
+            }
+
+insights_cache = InsightsCache()
+
+def configure_insights_cache(app):
+    """Select the backend from INSIGHTS_CACHE_BACKEND ('memory' or 'sqlite')"""
+    if app.config.get('INSIGHTS_CACHE_BACKEND', 'memory') == 'sqlite':
+        insights_cache.backend = SQLiteBackend(
+            app.config.get('INSIGHTS_CACHE_PATH', 'insights_cache.db'),
+            app.config.get('INSIGHTS_CACHE_SIZE', 100000)
+        )
+    else:
+        insights_cache.backend = MemoryBackend(app.config.get('INSIGHTS_CACHE_SIZE', 4096))
+    return insights_cache
@@ -0,0 +1,254 @@
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapper
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_THRESHOLD_MS = 200
+N_PLUS_ONE_THRESHOLD = 5
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class QueryCounter:
+    """Count the SQL statements an engine executes inside a with block"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        event.remove(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return False
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.max_query_seconds = 0.0
+        self.rows = 0
+        self.slow_queries = 0
+        self.failed_queries = 0
+        self.n_plus_one = 0
+
+class MetricsRegistry:
+    """Process-wide per-endpoint request and database metrics"""
+
+    def __init__(self):
+        self.endpoints = defaultdict(EndpointStats)
+        self.caches = {}
+        self.jobs = None
+        self.passwords = None
+        self._lock = threading.Lock()
+
+    def register_cache(self, name, cache):
+        # Any object with a stats() dict of hits/misses/evictions/size
+        self.caches[name] = cache
+
+    def register_jobs(self, runner):
+        # Any object with a stats() dict like jobs.JobRunner
+        self.jobs = runner
+
+    def register_passwords(self, hasher):
+        # Any object with a stats() dict like passwords.PasswordHasher
+        self.passwords = hasher
+
+    def record_request(self, endpoint, latency, stats):
+        with self._lock:
+            endpoint_stats = self.endpoints[endpoint]
+            endpoint_stats.requests += 1
+            endpoint_stats.latency_sum += latency
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    endpoint_stats.latency_buckets[i] += 1
+            endpoint_stats.queries += stats['count']
+            endpoint_stats.query_seconds += stats['seconds']
+            endpoint_stats.max_query_seconds = max(endpoint_stats.max_query_seconds, stats['max_seconds'])
+            endpoint_stats.rows += stats['rows']
+            endpoint_stats.slow_queries += stats['slow']
+            endpoint_stats.failed_queries += stats['failed']
+            endpoint_stats.n_plus_one += stats['n_plus_one']
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+
+        def sample(name, labels, value):
+            label_text = ','.join(f'{key}="{escape_label(val)}"' for key, val in labels)
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        def metric(name, metric_type, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                sample(name, labels, value)
+
+        def per_endpoint(attr):
+            return [((('endpoint', endpoint),), getattr(stats, attr)) for endpoint, stats in endpoints]
+
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+
+            lines.append("# HELP app_request_duration_seconds Request latency by endpoint")
+            lines.append("# TYPE app_request_duration_seconds histogram")
+            for endpoint, stats in endpoints:
+                for bound, count in zip(LATENCY_BUCKETS, stats.latency_buckets):
+                    sample('app_request_duration_seconds_bucket', (('endpoint', endpoint), ('le', bound)), count)
+                sample('app_request_duration_seconds_bucket', (('endpoint', endpoint), ('le', '+Inf')), stats.requests)
+                sample('app_request_duration_seconds_sum', (('endpoint', endpoint),), stats.latency_sum)
+                sample('app_request_duration_seconds_count', (('endpoint', endpoint),), stats.requests)
+
+            metric('app_db_queries_total', 'counter', 'SQL statements executed', per_endpoint('queries'))
+            metric('app_db_query_seconds_total', 'counter', 'Time spent executing SQL', per_endpoint('query_seconds'))
+            metric('app_db_query_max_seconds', 'gauge', 'Slowest single SQL statement', per_endpoint('max_query_seconds'))
+            metric('app_db_rows_total', 'counter', 'ORM rows loaded plus rows affected by writes', per_endpoint('rows'))
+            metric('app_db_slow_queries_total', 'counter', 'Statements over the slow query threshold', per_endpoint('slow_queries'))
+            metric('app_db_failed_queries_total', 'counter', 'Statements that raised a database error', per_endpoint('failed_queries'))
+            metric('app_db_n_plus_one_total', 'counter', 'Requests repeating one statement past the N+1 threshold', per_endpoint('n_plus_one'))
+
+        for field, metric_type in (('hits', 'counter'), ('misses', 'counter'), ('evictions', 'counter'), ('size', 'gauge')):
+            samples = [((('cache', name),), cache.stats()[field]) for name, cache in sorted(self.caches.items())]
+            metric(f"app_cache_{field}{'_total' if metric_type == 'counter' else ''}", metric_type, f"Cache {field}", samples)
+
+        # Only memoizing caches report how long their misses took to recompute
+        samples = []
+        for name, cache in sorted(self.caches.items()):
+            stats = cache.stats()
+            if 'recompute_seconds' in stats:
+                samples.append(((('cache', name),), stats['recompute_seconds']))
+        if samples:
+            metric('app_cache_recompute_seconds_total', 'counter', 'Time spent recomputing cache misses', samples)
+
+        if self.jobs is not None:
+            stats = self.jobs.stats()
+            for field in ('scheduled', 'coalesced', 'dropped', 'completed', 'failed'):
+                metric(f"app_jobs_{field}_total", 'counter', f"Background jobs {field}", [((), stats[field])])
+            metric('app_jobs_run_seconds_total', 'counter', 'Time spent running background jobs', [((), stats['run_seconds'])])
+            metric('app_jobs_queued', 'gauge', 'Background jobs waiting in the queue', [((), stats['queued'])])
+
+        if self.passwords is not None:
+            stats = self.passwords.stats()
+            metric('app_password_hash_calls_total', 'counter', 'Password hash and check calls', [((), stats['calls'])])
+            metric('app_password_hash_rejected_total', 'counter', 'Password hash calls refused for lack of a free slot', [((), stats['rejected'])])
+            metric('app_password_hash_seconds_total', 'counter', 'Time request threads spent waiting on password hashing', [((), stats['seconds'])])
+            metric('app_password_hash_in_flight', 'gauge', 'Password hash calls queued or running', [((), stats['in_flight'])])
+            metric('app_password_hash_pool_restarts_total', 'counter', 'Hashing pools replaced after a worker died', [((), stats['restarts'])])
+
+        return '\n'.join(lines) + '\n'
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+metrics = MetricsRegistry()
+
+def _request_stats():
+    if has_request_context():
+        return g.get('query_stats')
+    return None
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_query(statement, time.perf_counter() - conn.info['query_start_time'].pop(), cursor.rowcount)
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute, so its start time is popped and recorded here;
+    # otherwise every error would leave an entry behind on the pooled connection
+    conn = context.connection
+    if conn is None or conn.invalidated or context.statement is None:
+        return
+    started = conn.info.get('query_start_time')
+    if started:
+        _record_query(context.statement, time.perf_counter() - started.pop(), None, failed=True)
+
+def _record_query(statement, elapsed, rowcount, failed=False):
+    stats = _request_stats()
+
+    threshold_ms = stats['slow_threshold_ms'] if stats else SLOW_QUERY_THRESHOLD_MS
+    slow = elapsed * 1000 >= threshold_ms
+    if slow:
+        logger.warning("Slow query (%.1f ms) on %s: %s", elapsed * 1000,
+                       request.endpoint if has_request_context() else 'cli', ' '.join(statement.split()))
+
+    if stats is None:
+        return
+    stats['count'] += 1
+    stats['seconds'] += elapsed
+    stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+    stats['slow'] += slow
+    stats['failed'] += failed
+    stats['statements'][statement] += 1
+    if rowcount and rowcount > 0:
+        stats['rows'] += rowcount
+
+@event.listens_for(Mapper, 'load')
+def _on_orm_load(target, context):
+    stats = _request_stats()
+    if stats is not None:
+        stats['rows'] += 1
+
+def init_instrumentation(app):
+    """Collect per-request database metrics and request latency for an app"""
+    app.config.setdefault('SLOW_QUERY_THRESHOLD_MS', SLOW_QUERY_THRESHOLD_MS)
+    app.config.setdefault('N_PLUS_ONE_THRESHOLD', N_PLUS_ONE_THRESHOLD)
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_started = time.perf_counter()
+        g.query_stats = {
+            'count': 0,
+            'seconds': 0.0,
+            'max_seconds': 0.0,
+            'rows': 0,
+            'slow': 0,
+            'failed': 0,
+            'n_plus_one': 0,
+            'statements': Counter(),
+            'slow_threshold_ms': app.config['SLOW_QUERY_THRESHOLD_MS']
+        }
+
+    @app.after_request
+    def mark_streamed_response(response):
+        if response.is_streamed and 'query_stats' in g:
+            g.query_stats['streamed'] = True
+        return response
+
+    # stream_with_context tears the request down a second time once the body is sent,
+    # so streamed exports are recorded then, with their queries and full latency
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        stats = g.get('query_stats')
+        if stats is None:
+            return
+        if stats.pop('streamed', False):
+            return
+        g.pop('query_stats')
+        endpoint = request.endpoint or 'unknown'
+
+        repeated = [(statement, count) for statement, count in stats['statements'].items()
+                    if count >= app.config['N_PLUS_ONE_THRESHOLD']]
+        for statement, count in repeated:
+            logger.warning("Possible N+1 on %s: statement ran %d times: %s",
+                           endpoint, count, ' '.join(statement.split())[:200])
+        stats['n_plus_one'] = 1 if repeated else 0
+
+        metrics.record_request(endpoint, time.perf_counter() - g.pop('request_started'), stats)
@@ -0,0 +1,153 @@
+import logging
+import queue
+import threading
+import time
+from sqlalchemy import event
+from app import db
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = 2
+JOB_QUEUE_SIZE = 1000
+# How long a queued job waits so a burst of writes lands in one recompute
+JOB_COALESCE_SECONDS = 0.2
+WORKER_POLL_SECONDS = 5
+WORKER_BATCH_SIZE = 100
+
+class JobRunner:
+    """Thread pool draining a bounded queue of per-user recompute jobs"""
+
+    def __init__(self, app, task, workers=JOB_WORKERS, maxsize=JOB_QUEUE_SIZE, delay=JOB_COALESCE_SECONDS):
+        self.app = app
+        self.task = task
+        self.workers = workers
+        self.delay = delay
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.pending = set()
+        self.threads = []
+        self.scheduled = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.completed = 0
+        self.failed = 0
+        self.run_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"jobs-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self):
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def schedule(self, user_id):
+        with self._lock:
+            # A user already waiting in the queue picks up this write when their job runs
+            if user_id in self.pending:
+                self.coalesced += 1
+                return True
+            try:
+                self.queue.put_nowait((user_id, time.monotonic() + self.delay))
+            except queue.Full:
+                # Readers fall back to computing on request, so shedding load here is safe
+                self.dropped += 1
+                return False
+            self.pending.add(user_id)
+            self.scheduled += 1
+            return True
+
+    def join(self):
+        self.queue.join()
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                self.queue.task_done()
+                return
+            user_id, run_at = job
+            time.sleep(max(run_at - time.monotonic(), 0))
+
+            # Writes from here on need another run, so stop folding them into this one
+            with self._lock:
+                self.pending.discard(user_id)
+
+            started = time.perf_counter()
+            try:
+                with self.app.app_context():
+                    self.task(user_id)
+                succeeded = True
+            except Exception:
+                logger.exception("Recompute failed for user %s", user_id)
+                succeeded = False
+            with self._lock:
+                self.run_seconds += time.perf_counter() - started
+                if succeeded:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            self.queue.task_done()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'scheduled': self.scheduled,
+                'coalesced': self.coalesced,
+                'dropped': self.dropped,
+                'completed': self.completed,
+                'failed': self.failed,
+                'run_seconds': self.run_seconds,
+                'queued': self.queue.qsize()
+            }
+
+runner = None
+
+def schedule_recompute(user_id):
+    """Queue a derived-view recompute; a no-op unless the in-process runner is running"""
+    if runner is not None:
+        runner.schedule(user_id)
+
+def _after_commit(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        schedule_recompute(user_id)
+
+def _after_rollback(session):
+    session.info.pop('changed_user_ids', None)
+
+def init_jobs(app, task):
+    """Start the in-process runner unless JOBS_MODE hands the work to worker.py"""
+    global runner
+    if app.config.get('JOBS_MODE', 'thread') != 'thread':
+        return None
+
+    runner = JobRunner(
+        app, task,
+        workers=app.config.get('JOB_WORKERS', JOB_WORKERS),
+        maxsize=app.config.get('JOB_QUEUE_SIZE', JOB_QUEUE_SIZE),
+        delay=app.config.get('JOB_COALESCE_SECONDS', JOB_COALESCE_SECONDS)
+    ).start()
+    event.listen(db.session, 'after_commit', _after_commit)
+    event.listen(db.session, 'after_rollback', _after_rollback)
+    return runner
+
+def run_worker(app, task, find_stale, poll_interval=WORKER_POLL_SECONDS):
+    """Poll for users whose derived data is out of date and recompute them"""
+    worker_runner = JobRunner(app, task, workers=app.config.get('JOB_WORKERS', JOB_WORKERS)).start()
+    logger.info("Precompute worker started with %s threads", worker_runner.workers)
+    while True:
+        with app.app_context():
+            user_ids = find_stale(WORKER_BATCH_SIZE)
+        for user_id in user_ids:
+            worker_runner.schedule(user_id)
+        worker_runner.join()
+
+        # Keep draining while there is a backlog, otherwise wait for new writes
+        if len(user_ids) < WORKER_BATCH_SIZE:
+            time.sleep(poll_interval)
@@ -0,0 +1,82 @@
+import datetime
+from models import User, Transaction, SavingGoal, Budget, MonthlyRollup, DerivedView
+from insights_cache import insights_cache
+from jobs import schedule_recompute
+from utils import (
+    budget_period_starts, calculate_budget_status, summarize_rollups,
+    calculate_category_expenses_from_rollups, calculate_monthly_expenses_from_rollups, generate_insights_from_rollups
+)
+
+# Queries load_dashboard may run, plus the flask-login user load (which also fetches the settings)
+DASHBOARD_QUERY_BUDGET = 8
+RECENT_TRANSACTIONS = 5
+
+def load_dashboard(user_id, data_version=None):
+    """Everything the dashboard renders, fetched in a fixed number of indexed queries"""
+    recent_transactions = Transaction.get_transactions(user_id, limit=RECENT_TRANSACTIONS)
+    goals = SavingGoal.get_goals(user_id)
+
+    # Totals, charts, budget status and insights come from the precomputed view when it is current
+    derived = load_derived_view(user_id, data_version)
+    if derived is None:
+        rollups = MonthlyRollup.get_rollups(user_id)
+        budgets = Budget.get_budgets(user_id)
+        spending = Transaction.get_period_spending(user_id, budget_period_starts())
+        derived = build_derived_view(rollups, budgets, spending, load_insights(user_id, data_version, rollups, budgets, spending))
+
+    return dict(derived, recent_transactions=recent_transactions, goals=goals)
+
+def load_derived_view(user_id, data_version):
+    """The stored derived view if still current, otherwise None after queueing a recompute"""
+    if data_version is None:
+        return None
+    derived = DerivedView.get_fresh(user_id, data_version)
+    if derived is None:
+        schedule_recompute(user_id)
+    return derived
+
+def build_derived_view(rollups, budgets, spending, insights):
+    summary = summarize_rollups(rollups)
+    return {
+        'total_income': summary['total_income'],
+        'total_expenses': summary['total_expenses'],
+        'current_balance': summary['current_balance'],
+        'category_expenses': calculate_category_expenses_from_rollups(rollups),
+        'monthly_expenses': calculate_monthly_expenses_from_rollups(rollups),
+        'budget_status': calculate_budget_status(budgets, spending),
+        'insights': insights
+    }
+
+def compute_derived_view(user_id):
+    """Recompute and store a user's derived view; run by the background jobs"""
+    # Read the version first so a write that lands mid-compute leaves the result stale
+    data_version = User.query.with_entities(User.data_version).filter_by(id=user_id).scalar()
+    if data_version is None:
+        return None
+    computed_on = datetime.date.today()
+
+    rollups = MonthlyRollup.get_rollups(user_id)
+    budgets = Budget.get_budgets(user_id)
+    spending = Transaction.get_period_spending(user_id, budget_period_starts(computed_on))
+    derived = build_derived_view(rollups, budgets, spending, compute_insights(user_id, rollups, budgets, spending))
+
+    DerivedView.store(user_id, data_version, computed_on, derived)
+    return derived
+
+def compute_insights(user_id, rollups, budgets, spending):
+    # The recurring reminder is only shown once there is enough history for insights
+    recurring_expense = None
+    if summarize_rollups(rollups)['transaction_count'] >= 3:
+        recurring_expense = Transaction.get_recurring_expense(user_id)
+    return generate_insights_from_rollups(rollups, budgets, spending, recurring_expense)
+
+def load_insights(user_id, data_version, rollups, budgets=None, spending=None):
+    """Insights memoized per data_version; budgets and spending are only queried when the cache misses"""
+    def compute():
+        current_budgets = Budget.get_budgets(user_id) if budgets is None else budgets
+        current_spending = spending
+        if current_spending is None:
+            current_spending = Transaction.get_period_spending(user_id, budget_period_starts())
+        return compute_insights(user_id, rollups, current_budgets, current_spending)
+
+    return insights_cache.get_or_compute(user_id, data_version, compute)
@@ -1 +1,4 @@
-from app import app  # noqa: F401
\ No newline at end of file
+from app import app  # noqa: F401
+
+if __name__ == "__main__":
+    app.run(debug=True)
\ No newline at end of file
@@ -1,8 +1,25 @@
+from flask import g, has_request_context
 from flask_login import UserMixin
-from app import db, bcrypt
+from app import db, login_manager
+from cache import LRUCache
+from insights_cache import insights_cache
+from passwords import password_hasher
+from search import (
+    ensure_search_index, index_transactions, match_expression, rebuild_search_index, search_matches,
+    unindex_transactions
+)
+from storage import MAX_AMOUNT, Cents, LookupCode, category_codes, type_codes, seed_lookups
+from utils import RECURRING_INTERVALS, next_occurrence
 import datetime
+import base64
+import json
+import math
+from collections import namedtuple
+from sqlalchemy import bindparam, event, literal, select, text, true, tuple_
+from sqlalchemy.schema import CreateColumn
 from sqlalchemy.ext.declarative import declared_attr
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, case
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
@@ -10,6 +27,8 @@ class User(db.Model, UserMixin):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(256), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    # Bumped by every write helper; drives ETags and rendered page caching
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     transactions = db.relationship('Transaction', backref='author', lazy=True)
     goals = db.relationship('SavingGoal', backref='author', lazy=True)
@@ -17,32 +36,117 @@ class User(db.Model, UserMixin):
 
     @staticmethod
     def create_user(username, email, password):
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
-        user = User(username=username, email=email, password_hash=hashed_password)
+        user = User(username=username, email=email, password_hash=password_hasher.hash(password))
         db.session.add(user)
         db.session.commit()
         return user.id
 
+    @staticmethod
+    def bump_data_version(user_id):
+        # Runs inside the caller's transaction so the version moves with the write
+        db.session.execute(
+            User.__table__.update()
+            .where(User.id == user_id)
+            .values(data_version=User.data_version + 1)
+        )
+        # Recorded so after-commit hooks know whose derived data changed
+        db.session.info.setdefault('changed_user_ids', set()).add(user_id)
+
     @staticmethod
     def check_password(user, password):
-        if isinstance(user, User):
-            return bcrypt.check_password_hash(user.password_hash, password)
-        return False
+        if not isinstance(user, User) or not password_hasher.check(user.password_hash, password):
+            return False
+        # Move the stored hash to the configured work factor while the plain password is at hand
+        if password_hasher.needs_rehash(user.password_hash):
+            user.password_hash = password_hasher.hash(password)
+            db.session.commit()
+        return True
+
+    @staticmethod
+    def taken_fields(username, email):
+        """Which of username and email already belong to an account, in one query"""
+        rows = db.session.execute(
+            select(User.username, User.email).where((User.username == username) | (User.email == email)).limit(2)
+        ).all()
+        taken = set()
+        for row in rows:
+            if row.username == username:
+                taken.add('username')
+            if row.email == email:
+                taken.add('email')
+        return taken
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+    snapshot = settings_cache.get(user_id)
+    if snapshot is not None:
+        user = db.session.get(User, user_id)
+    else:
+        # On a settings cache miss the settings row rides along, so views formatting amounts do not query again
+        row = db.session.execute(
+            db.select(User, UserSettings)
+            .outerjoin(UserSettings, UserSettings.user_id == User.id)
+            .where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        user, settings = row
+        if settings is not None:
+            snapshot = UserSettings.snapshot(settings)
+            settings_cache.set(user_id, snapshot)
+    if snapshot is not None and has_request_context():
+        g.setdefault('user_settings', {})[user_id] = snapshot
+    return user
+
+# Amounts are stored as integer cents, so larger cursor values could not be bound
+MAX_CURSOR_AMOUNT = MAX_AMOUNT
+
+def is_number(value):
+    # JSON true/false decode to bools, which are ints to isinstance
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+# Optional narrowing of a transaction listing; None, empty or False leaves that field unfiltered
+TransactionFilter = namedtuple(
+    'TransactionFilter', ['start', 'end', 'categories', 'type', 'min_amount', 'max_amount', 'recurring_only'],
+    defaults=(None, None, (), None, None, None, False)
+)
 
 class Transaction(db.Model):
+    __table_args__ = (
+        db.Index('ix_transaction_user_date', 'user_id', 'date', 'id'),
+        db.Index('ix_transaction_user_type_category_date', 'user_id', 'type', 'category', 'date'),
+        db.Index('ix_transaction_user_amount', 'user_id', 'amount'),
+        db.Index('ix_transaction_user_category', 'user_id', 'category'),
+        db.Index('ix_transaction_recurring_next', 'recurring', 'next_occurrence'),
+        # Backs the recurring-only filter, covering its totals; SQLite uses it only while that predicate
+        # renders as this text
+        db.Index('ix_transaction_user_recurring_date', 'user_id', 'date', 'id', 'type', 'amount',
+                 sqlite_where=text('recurring IS 1 OR series_id IS NOT NULL')),
+        # Each period of a recurring series is materialized at most once
+        db.Index('ix_transaction_series_date', 'series_id', 'date', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.String(100), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
-    category = db.Column(db.String(50), nullable=False)
+    amount = db.Column(Cents, nullable=False)
+    # Stored as lookup codes; the attributes still read and write names
+    category = db.Column('category_id', LookupCode(category_codes), db.ForeignKey('category.id'), key='category', nullable=False)
     date = db.Column(db.Date, nullable=False, default=datetime.date.today)
-    type = db.Column(db.String(20), nullable=False)
+    type = db.Column('type_id', LookupCode(type_codes), db.ForeignKey('transaction_type.id'), key='type', nullable=False)
     recurring = db.Column(db.Boolean, default=False)
     recurring_interval = db.Column(db.String(20), nullable=True)
+    # Set on series rows: the next occurrence the materializer has not created yet
+    next_occurrence = db.Column(db.Date, nullable=True)
+    # Set on materialized occurrences: the recurring transaction they were generated from
+    series_id = db.Column(db.Integer, db.ForeignKey('transaction.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
     @staticmethod
     def add_transaction(user_id, description, amount, category, date, transaction_type, recurring=False, recurring_interval=None):
+        category_codes.ensure([category])
+        type_codes.ensure([transaction_type])
         transaction = Transaction(
             user_id=user_id,
             description=description,
@@ -53,51 +157,496 @@ class Transaction(db.Model):
             recurring=recurring,
             recurring_interval=recurring_interval
         )
+        if recurring and recurring_interval in RECURRING_INTERVALS:
+            transaction.next_occurrence = next_occurrence(date, recurring_interval, date)
         db.session.add(transaction)
+        MonthlyRollup.apply(user_id, date, category, transaction_type, amount)
+        User.bump_data_version(user_id)
         db.session.commit()
+        insights_cache.invalidate(user_id)
         return transaction.id
 
     @staticmethod
-    def get_transactions(user_id, limit=None, sort_by='date', sort_order=-1):
-        query = Transaction.query.filter_by(user_id=user_id)
+    def bulk_add_transactions(user_id, rows):
+        if not rows:
+            return 0
+        Transaction.insert_rows(user_id, rows)
+        db.session.commit()
+        insights_cache.invalidate(user_id)
+        return len(rows)
+
+    @staticmethod
+    def insert_rows(user_id, rows):
+        # One batched insert plus one batched rollup upsert; the caller commits
+        category_codes.ensure({row['category'] for row in rows})
+        type_codes.ensure({row['type'] for row in rows})
+        values = []
+        for row in rows:
+            # Recurring rows start their series as add_transaction does, so materializing resumes after them
+            first = None
+            if row.get('recurring') and row.get('recurring_interval') in RECURRING_INTERVALS:
+                first = next_occurrence(row['date'], row['recurring_interval'], row['date'])
+            values.append(dict(row, user_id=user_id, next_occurrence=first))
+        db.session.execute(Transaction.__table__.insert(), values)
+        # The executemany holds SQLite's write lock throughout and each row takes max(id) + 1, so the
+        # batch owns the contiguous ids ending at the last rowid; ordered RETURNING would insert row by row
+        last_id = db.session.execute(text('SELECT last_insert_rowid()')).scalar()
+        index_transactions(db.session.connection(), [
+            (transaction_id, user_id, row['description'], row['category'])
+            for transaction_id, row in zip(range(last_id - len(rows) + 1, last_id + 1), rows)
+        ])
+
+        buckets = {}
+        for row in rows:
+            key = (row['date'].strftime('%Y-%m'), row['category'], row['type'])
+            total, count = buckets.get(key, (0.0, 0))
+            buckets[key] = (total + row['amount'], count + 1)
+        MonthlyRollup.apply_many(user_id, buckets)
+
+        User.bump_data_version(user_id)
+
+    @staticmethod
+    def sort_column(sort_by):
+        if sort_by == 'amount':
+            return Transaction.amount
+        if sort_by == 'category':
+            return Transaction.category
+        return Transaction.date
+
+    @staticmethod
+    def encode_cursor(transaction, sort_by='date'):
+        # Opaque token holding the (sort value, id) keyset of the last row on a page
+        value = getattr(transaction, Transaction.sort_column(sort_by).key)
+        if isinstance(value, datetime.date):
+            value = value.isoformat()
+        return base64.urlsafe_b64encode(json.dumps([value, transaction.id]).encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor, sort_by='date'):
+        try:
+            value, transaction_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            sort_column = Transaction.sort_column(sort_by)
+            # Checked against the sort column so a crafted cursor cannot reach the bind as the wrong type
+            if sort_column is Transaction.date:
+                value = datetime.date.fromisoformat(value)
+            elif sort_column is Transaction.amount:
+                if not is_number(value) or not math.isfinite(value) or abs(value) > MAX_CURSOR_AMOUNT:
+                    raise ValueError('amount cursor value must be a finite number')
+            elif not isinstance(value, str):
+                raise ValueError(f"{sort_column.key} cursor value must be a string")
+            if not is_number(transaction_id) or not isinstance(transaction_id, int) or not 0 <= transaction_id < 2 ** 63:
+                raise ValueError('cursor id must be a row id')
+            return value, transaction_id
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    @staticmethod
+    def get_transactions(user_id, limit=None, sort_by='date', sort_order=-1, cursor=None, filters=None):
+        return db.session.scalars(
+            Transaction.transactions_statement(user_id, limit, sort_by, sort_order, cursor, filters)
+        ).all()
+
+    @staticmethod
+    def filter_predicates(user_id, filters=None):
+        # Plain comparisons on bare columns, so SQLite can range-scan the (user_id, ...) indexes;
+        # values bind through the column types as lookup codes and cents
+        predicates = [Transaction.user_id == user_id]
+        if filters is None:
+            return predicates
+        if filters.start:
+            predicates.append(Transaction.date >= filters.start)
+        if filters.end:
+            predicates.append(Transaction.date <= filters.end)
+        if filters.categories:
+            predicates.append(Transaction.category.in_(filters.categories))
+        if filters.type:
+            predicates.append(Transaction.type == filters.type)
+        if filters.min_amount is not None:
+            predicates.append(Transaction.amount >= filters.min_amount)
+        if filters.max_amount is not None:
+            predicates.append(Transaction.amount <= filters.max_amount)
+        if filters.recurring_only:
+            # Series rows and the occurrences materialized from them
+            predicates.append(Transaction.recurring.is_(True) | Transaction.series_id.isnot(None))
+        return predicates
+
+    @staticmethod
+    def totals_statement(user_id, filters=None):
+        # Summed as integer cents in SQLite, so totals are exact
+        return select(
+            func.count(Transaction.id).label('count'),
+            func.coalesce(func.sum(case((Transaction.type == 'income', Transaction.amount))), 0).label('total_income'),
+            func.coalesce(func.sum(case((Transaction.type == 'expense', Transaction.amount))), 0).label('total_expenses')
+        ).where(*Transaction.filter_predicates(user_id, filters))
+
+    @staticmethod
+    def get_totals(user_id, filters=None):
+        return Transaction.totals_from_row(db.session.execute(Transaction.totals_statement(user_id, filters)).one())
+
+    @staticmethod
+    def totals_from_row(row):
+        return {
+            'count': row.count,
+            'total_income': row.total_income,
+            'total_expenses': row.total_expenses,
+            'net': round(row.total_income - row.total_expenses, 2)
+        }
+
+    @staticmethod
+    def transactions_statement(user_id, limit=None, sort_by='date', sort_order=-1, cursor=None, filters=None):
+        # Shared by the sync views and the async read API
+        query = select(Transaction).where(*Transaction.filter_predicates(user_id, filters))
+        sort_column = Transaction.sort_column(sort_by)
         
-        # Apply sorting
-        if sort_by == 'date':
+        # Resume after the cursor row instead of skipping rows with an offset
+        if cursor:
+            value, last_id = Transaction.decode_cursor(cursor, sort_by)
+            # Bound with the column's type so names and amounts are stored-form codes and cents
+            value = literal(value, sort_column.type)
             if sort_order == -1:
-                query = query.order_by(Transaction.date.desc())
+                query = query.filter(tuple_(sort_column, Transaction.id) < tuple_(value, last_id))
             else:
-                query = query.order_by(Transaction.date)
-        elif sort_by == 'amount':
-            if sort_order == -1:
-                query = query.order_by(Transaction.amount.desc())
-            else:
-                query = query.order_by(Transaction.amount)
-        elif sort_by == 'category':
-            if sort_order == -1:
-                query = query.order_by(Transaction.category.desc())
-            else:
-                query = query.order_by(Transaction.category)
+                query = query.filter(tuple_(sort_column, Transaction.id) > tuple_(value, last_id))
+        
+        # Apply sorting; id breaks ties so pages never repeat or skip rows
+        if sort_order == -1:
+            query = query.order_by(sort_column.desc(), Transaction.id.desc())
+        else:
+            query = query.order_by(sort_column, Transaction.id)
         
         # Apply limit if specified
         if limit:
             query = query.limit(limit)
         
+        return query
+
+    @staticmethod
+    def get_transactions_page(user_id, page_size, sort_by='date', sort_order=-1, cursor=None, filters=None):
+        """One page of the user's filtered transactions plus the totals over every row the filters match"""
+        # The totals aggregate is joined onto each page row, so both come back from a single statement;
+        # it ignores the cursor and so covers the whole filtered set, not just this page. SQLite never
+        # reorders a LEFT JOIN, so the page keeps walking its index in sort order instead of sorting
+        # every filtered row under a one-row inner join
+        totals = Transaction.totals_statement(user_id, filters).subquery('totals')
+        statement = Transaction.transactions_statement(user_id, page_size + 1, sort_by, sort_order, cursor, filters)
+        # Fetch one extra row to learn whether another page exists
+        rows = db.session.execute(statement.add_columns(*totals.c).outerjoin(totals, true())).all()
+        if rows:
+            totals = Transaction.totals_from_row(rows[0])
+        elif cursor:
+            # Past the last row (e.g. after deletes) there is no row to carry the totals
+            totals = Transaction.get_totals(user_id, filters)
+        else:
+            totals = {'count': 0, 'total_income': 0.0, 'total_expenses': 0.0, 'net': 0.0}
+        transactions = [row.Transaction for row in rows[:page_size]]
+        next_cursor = None
+        if len(rows) > page_size:
+            next_cursor = Transaction.encode_cursor(transactions[-1], sort_by)
+        return transactions, next_cursor, totals
+
+    @staticmethod
+    def get_chart_rows(user_id, page_size, filters=None, cursor=None):
+        """One oldest-first page of the fields client-side charts need, without descriptions"""
+        statement = Transaction.transactions_statement(user_id, page_size + 1, 'date', 1, cursor, filters).with_only_columns(
+            Transaction.id, Transaction.date, Transaction.amount, Transaction.category, Transaction.type, Transaction.recurring
+        )
+        # Fetch one extra row to learn whether another page exists
+        rows = db.session.execute(statement).all()
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = Transaction.encode_cursor(rows[-1], 'date')
+        return rows, next_cursor
+
+    @staticmethod
+    def search_page(user_id, query, page_size, cursor=None):
+        """One page of the user's transactions matching free text, best match first"""
+        expression = match_expression(query)
+        if expression is None:
+            return [], None
+        after = Transaction.decode_search_cursor(cursor) if cursor else None
+        # Fetch one extra match to learn whether another page exists
+        matches = search_matches(user_id, expression, page_size + 1, after)
+        rows = db.session.execute(
+            select(Transaction, matches.c.score)
+            .join(matches, matches.c.rowid == Transaction.id)
+            .filter(Transaction.user_id == user_id)
+            .order_by(matches.c.score, Transaction.id.desc())
+        ).all()
+        next_cursor = None
+        if len(rows) > page_size:
+            transaction, score = rows[page_size - 1]
+            next_cursor = base64.urlsafe_b64encode(json.dumps([score, transaction.id]).encode()).decode()
+        return [transaction for transaction, score in rows[:page_size]], next_cursor
+
+    @staticmethod
+    def decode_search_cursor(cursor):
+        try:
+            score, transaction_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return float(score), int(transaction_id)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    @staticmethod
+    def iter_transactions(user_id, batch_size=1000):
+        # Read rows from the cursor in batches instead of materializing them all
+        return Transaction.query.filter_by(user_id=user_id).order_by(
+            Transaction.date.desc(), Transaction.id.desc()
+        ).yield_per(batch_size)
+
+    @staticmethod
+    def get_period_spending(user_id, period_starts):
+        rows = db.session.execute(Transaction.period_spending_statement(user_id, period_starts)).all()
+        return Transaction.spending_from_rows(rows, period_starts)
+
+    @staticmethod
+    def period_spending_statement(user_id, period_starts):
+        # One grouped query with a conditional SUM per budget period for each category
+        period_totals = [
+            func.sum(case((Transaction.date >= period_start, Transaction.amount), else_=0.0))
+            for period_start in period_starts.values()
+        ]
+        return select(Transaction.category, *period_totals).filter(
+            Transaction.user_id == user_id,
+            Transaction.type == 'expense',
+            Transaction.date >= min(period_starts.values())
+        ).group_by(Transaction.category)
+
+    @staticmethod
+    def spending_from_rows(rows, period_starts):
+        spending = {}
+        for category, *totals in rows:
+            for period, total in zip(period_starts, totals):
+                spending[(category, period)] = float(total or 0.0)
+        return spending
+
+    @staticmethod
+    def period_bucket(granularity):
+        # SQLite expression for the calendar period start (YYYY-MM-DD) of each row
+        if granularity == 'day':
+            return func.strftime('%Y-%m-%d', Transaction.date)
+        if granularity == 'week':
+            return func.date(Transaction.date, 'weekday 0', '-6 days')
+        if granularity == 'quarter':
+            quarter_month = (db.cast(func.strftime('%m', Transaction.date), db.Integer) - 1) // 3 * 3 + 1
+            return func.printf('%s-%02d-01', func.strftime('%Y', Transaction.date), quarter_month)
+        if granularity == 'year':
+            return func.strftime('%Y-01-01', Transaction.date)
+        return func.strftime('%Y-%m-01', Transaction.date)
+
+    @staticmethod
+    def get_timeseries(user_id, start, end, granularity='month', category=None, transaction_type=None):
+        # One grouped query over the date range; empty periods are filled in by the caller
+        bucket = Transaction.period_bucket(granularity).label('period_start')
+        query = db.session.query(
+            bucket,
+            Transaction.type,
+            func.sum(Transaction.amount),
+            func.count(Transaction.id)
+        ).filter(
+            Transaction.user_id == user_id,
+            Transaction.date >= start,
+            Transaction.date <= end
+        )
+        if transaction_type:
+            query = query.filter(Transaction.type == transaction_type)
+        if category:
+            query = query.filter(Transaction.category == category)
+        return query.group_by(bucket, Transaction.type).order_by(bucket).all()
+
+    @staticmethod
+    def get_recurring_series(user_id=None, due_by=None, after_id=0, limit=None):
+        # Recurring rows with a known interval, optionally only those with an occurrence due
+        query = Transaction.query.filter(
+            Transaction.recurring.is_(True),
+            Transaction.recurring_interval.in_(RECURRING_INTERVALS),
+            Transaction.id > after_id
+        )
+        if user_id is not None:
+            query = query.filter(Transaction.user_id == user_id)
+        if due_by is not None:
+            query = query.filter(
+                (Transaction.next_occurrence.is_(None)) | (Transaction.next_occurrence <= due_by)
+            )
+        query = query.order_by(Transaction.id)
+        if limit is not None:
+            query = query.limit(limit)
         return query.all()
 
+    @staticmethod
+    def get_unlinked_rows(user_ids, descriptions, since):
+        # Plain rows that may be occurrences of a series without the link, e.g. restored by an import
+        return Transaction.query.with_entities(
+            Transaction.id, Transaction.user_id, Transaction.description, Transaction.amount,
+            Transaction.category, Transaction.type, Transaction.date
+        ).filter(
+            Transaction.user_id.in_(user_ids),
+            Transaction.date >= since,
+            Transaction.description.in_(descriptions),
+            Transaction.series_id.is_(None),
+            Transaction.recurring.isnot(True)
+        ).all()
+
+    @staticmethod
+    def link_to_series(links):
+        # links are (row id, series id, user id); one batched update, the caller commits
+        table = Transaction.__table__
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('row_id')).values(series_id=bindparam('link_series_id')),
+            [{'row_id': row_id, 'link_series_id': series_id} for row_id, series_id, _ in links]
+        )
+        for user_id in {user_id for _, _, user_id in links}:
+            User.bump_data_version(user_id)
+
+    @staticmethod
+    def advance_series(next_dates):
+        # next_dates maps series id to its first occurrence not yet materialized; the caller commits
+        table = Transaction.__table__
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('series_row_id')).values(next_occurrence=bindparam('next_date')),
+            [{'series_row_id': series_id, 'next_date': date} for series_id, date in next_dates.items()]
+        )
+
+    @staticmethod
+    def get_recurring_expense(user_id):
+        return Transaction.query.filter_by(
+            user_id=user_id,
+            type='expense',
+            recurring=True
+        ).order_by(Transaction.date.desc(), Transaction.id.desc()).first()
+
     @staticmethod
     def delete_transaction(transaction_id, user_id):
-        transaction = Transaction.query.filter_by(id=transaction_id, user_id=user_id).first()
-        if transaction:
-            db.session.delete(transaction)
-            db.session.commit()
-            return True
-        return False
+        # Delete first, so only the writer that actually removed the row takes it out of its bucket
+        table = Transaction.__table__
+        deleted = db.session.execute(
+            table.delete()
+            .where(table.c.id == transaction_id, table.c.user_id == user_id)
+            .returning(table.c.id, table.c.date, table.c.category, table.c.type, table.c.amount)
+        ).first()
+        if deleted is None:
+            db.session.rollback()
+            return False
+        unindex_transactions(db.session.connection(), [deleted.id])
+        MonthlyRollup.apply(user_id, deleted.date, deleted.category, deleted.type, -deleted.amount, count_delta=-1)
+        User.bump_data_version(user_id)
+        db.session.commit()
+        insights_cache.invalidate(user_id)
+        return True
+
+# Rows written through the ORM keep the search index in step within the same flush
+SEARCHABLE_ATTRIBUTES = ('user_id', 'description', 'category')
+
+@event.listens_for(Transaction, 'after_insert')
+def _index_inserted_transaction(mapper, connection, transaction):
+    index_transactions(connection, [(transaction.id, transaction.user_id, transaction.description, transaction.category)])
+
+@event.listens_for(Transaction, 'after_update')
+def _reindex_updated_transaction(mapper, connection, transaction):
+    state = db.inspect(transaction)
+    if any(state.attrs[name].history.has_changes() for name in SEARCHABLE_ATTRIBUTES):
+        unindex_transactions(connection, [transaction.id])
+        index_transactions(connection, [(transaction.id, transaction.user_id, transaction.description, transaction.category)])
+
+@event.listens_for(Transaction, 'after_delete')
+def _unindex_deleted_transaction(mapper, connection, transaction):
+    unindex_transactions(connection, [transaction.id])
+
+class MonthlyRollup(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    year_month = db.Column(db.String(7), primary_key=True)
+    category = db.Column('category_id', LookupCode(category_codes), db.ForeignKey('category.id'), key='category', primary_key=True)
+    type = db.Column('type_id', LookupCode(type_codes), db.ForeignKey('transaction_type.id'), key='type', primary_key=True)
+    total = db.Column(Cents, nullable=False, default=0.0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    @staticmethod
+    def apply(user_id, date, category, transaction_type, amount, count_delta=1):
+        # Adjust the bucket inside the caller's transaction; the caller commits
+        MonthlyRollup.apply_many(user_id, {(date.strftime('%Y-%m'), category, transaction_type): (amount, count_delta)})
+
+    @staticmethod
+    def apply_many(user_id, buckets):
+        """Add {(year_month, category, type): (amount, count)} deltas to the user's buckets in one statement"""
+        if not buckets:
+            return
+        table = MonthlyRollup.__table__
+        # The delta is added inside the upsert, under SQLite's write lock, so concurrent writers to one
+        # bucket cannot overwrite each other's totals the way a read-then-write of the row could
+        upsert = sqlite_insert(table)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.year_month, table.c.category, table.c.type],
+            set_={'total': table.c.total + upsert.excluded.total, 'count': table.c.count + upsert.excluded.count}
+        )
+        db.session.execute(upsert, [
+            {'user_id': user_id, 'year_month': year_month, 'category': category, 'type': transaction_type,
+             'total': total, 'count': count}
+            for (year_month, category, transaction_type), (total, count) in buckets.items()
+        ])
+        # Buckets emptied by deletes go away, as if they had never been written
+        if any(count < 0 for total, count in buckets.values()):
+            db.session.execute(table.delete().where(table.c.user_id == user_id, table.c.count <= 0))
+
+    @staticmethod
+    def get_rollups(user_id, since=None, transaction_type=None):
+        query = MonthlyRollup.query.filter_by(user_id=user_id)
+        if since:
+            query = query.filter(MonthlyRollup.year_month >= since)
+        if transaction_type:
+            query = query.filter_by(type=transaction_type)
+        return query.order_by(MonthlyRollup.year_month).all()
+
+    @staticmethod
+    def rebuild(user_id=None):
+        # Recompute buckets from the transaction table for backfill or repair
+        delete = MonthlyRollup.__table__.delete()
+        grouped = db.session.query(
+            Transaction.user_id,
+            func.strftime('%Y-%m', Transaction.date),
+            Transaction.category,
+            Transaction.type,
+            func.sum(Transaction.amount),
+            func.count(Transaction.id)
+        )
+        if user_id is not None:
+            delete = delete.where(MonthlyRollup.user_id == user_id)
+            grouped = grouped.filter(Transaction.user_id == user_id)
+        grouped = grouped.group_by(
+            Transaction.user_id,
+            func.strftime('%Y-%m', Transaction.date),
+            Transaction.category,
+            Transaction.type
+        )
+
+        db.session.execute(delete)
+        result = db.session.execute(MonthlyRollup.__table__.insert().from_select(
+            ['user_id', 'year_month', 'category', 'type', 'total', 'count'],
+            grouped.statement
+        ))
+        db.session.commit()
+        if user_id is not None:
+            insights_cache.invalidate(user_id)
+        else:
+            insights_cache.clear()
+        return result.rowcount
+
+    @staticmethod
+    def needs_backfill():
+        # A database from before the rollups gets an empty table alongside its existing transactions
+        return (
+            db.session.query(MonthlyRollup.query.exists()).scalar() is False
+            and db.session.query(Transaction.query.exists()).scalar() is True
+        )
 
 class SavingGoal(db.Model):
+    __table_args__ = (
+        db.Index('ix_saving_goal_user_deadline', 'user_id', 'deadline'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    target_amount = db.Column(db.Float, nullable=False)
-    current_amount = db.Column(db.Float, default=0.0)
+    target_amount = db.Column(Cents, nullable=False)
+    current_amount = db.Column(Cents, default=0.0)
     deadline = db.Column(db.Date, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -112,6 +661,7 @@ class SavingGoal(db.Model):
             deadline=deadline
         )
         db.session.add(goal)
+        User.bump_data_version(user_id)
         db.session.commit()
         return goal.id
 
@@ -124,6 +674,7 @@ class SavingGoal(db.Model):
         goal = SavingGoal.query.filter_by(id=goal_id, user_id=user_id).first()
         if goal:
             goal.current_amount = new_amount
+            User.bump_data_version(user_id)
             db.session.commit()
             return True
         return False
@@ -133,20 +684,26 @@ class SavingGoal(db.Model):
         goal = SavingGoal.query.filter_by(id=goal_id, user_id=user_id).first()
         if goal:
             db.session.delete(goal)
+            User.bump_data_version(user_id)
             db.session.commit()
             return True
         return False
 
 class Budget(db.Model):
+    __table_args__ = (
+        db.Index('ix_budget_user_category_period', 'user_id', 'category', 'period'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    category = db.Column(db.String(50), nullable=False)
-    limit_amount = db.Column(db.Float, nullable=False)
+    category = db.Column('category_id', LookupCode(category_codes), db.ForeignKey('category.id'), key='category', nullable=False)
+    limit_amount = db.Column(Cents, nullable=False)
     period = db.Column(db.String(20), default="monthly")
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
     @staticmethod
     def add_budget(user_id, category, limit_amount, period="monthly"):
+        category_codes.ensure([category])
         budget = Budget(
             user_id=user_id,
             category=category,
@@ -154,7 +711,9 @@ class Budget(db.Model):
             period=period
         )
         db.session.add(budget)
+        User.bump_data_version(user_id)
         db.session.commit()
+        insights_cache.invalidate(user_id)
         return budget.id
 
     @staticmethod
@@ -166,7 +725,9 @@ class Budget(db.Model):
         budget = Budget.query.filter_by(id=budget_id, user_id=user_id).first()
         if budget:
             budget.limit_amount = limit_amount
+            User.bump_data_version(user_id)
             db.session.commit()
+            insights_cache.invalidate(user_id)
             return True
         return False
 
@@ -175,10 +736,61 @@ class Budget(db.Model):
         budget = Budget.query.filter_by(id=budget_id, user_id=user_id).first()
         if budget:
             db.session.delete(budget)
+            User.bump_data_version(user_id)
             db.session.commit()
+            insights_cache.invalidate(user_id)
             return True
         return False
 
+class DerivedView(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    data_version = db.Column(db.Integer, nullable=False)
+    computed_on = db.Column(db.Date, nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    @staticmethod
+    def get_fresh(user_id, data_version):
+        # Only usable if no write landed since it was computed and the periods have not rolled over
+        view = db.session.get(DerivedView, user_id)
+        if view and view.data_version == data_version and view.computed_on == datetime.date.today():
+            return json.loads(view.payload)
+        return None
+
+    @staticmethod
+    def store(user_id, data_version, computed_on, payload):
+        # Upsert that never replaces a view computed from a newer data version
+        values = {
+            'user_id': user_id,
+            'data_version': data_version,
+            'computed_on': computed_on,
+            'payload': json.dumps(payload),
+            'computed_at': datetime.datetime.utcnow()
+        }
+        statement = sqlite_insert(DerivedView.__table__).values(**values)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['user_id'],
+            set_={key: statement.excluded[key] for key in values if key != 'user_id'},
+            where=DerivedView.__table__.c.data_version <= statement.excluded.data_version
+        ))
+        db.session.commit()
+
+    @staticmethod
+    def stale_user_ids(limit=100):
+        # Users whose stored view is missing, behind their data version or from a previous day
+        return [row.id for row in db.session.query(User.id).outerjoin(
+            DerivedView, DerivedView.user_id == User.id
+        ).filter(
+            (DerivedView.user_id.is_(None)) |
+            (DerivedView.data_version != User.data_version) |
+            (DerivedView.computed_on != datetime.date.today())
+        ).limit(limit)]
+
+# Detached, read-only copy of a user's settings that is safe to share across requests
+SettingsSnapshot = namedtuple('SettingsSnapshot', ['id', 'user_id', 'theme', 'currency', 'notifications_enabled'])
+
+settings_cache = LRUCache(maxsize=4096, ttl=300)
+
 class UserSettings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     theme = db.Column(db.String(20), default='dark')
@@ -202,6 +814,37 @@ class UserSettings(db.Model):
             db.session.commit()
         return settings
 
+    @staticmethod
+    def get_cached_settings(user_id):
+        # Memoized for the current request, then served from the process-wide LRU
+        request_cache = g.setdefault('user_settings', {}) if has_request_context() else {}
+        if user_id in request_cache:
+            return request_cache[user_id]
+
+        settings = settings_cache.get(user_id)
+        if settings is None:
+            settings = UserSettings.snapshot(UserSettings.get_settings(user_id))
+            settings_cache.set(user_id, settings)
+
+        request_cache[user_id] = settings
+        return settings
+
+    @staticmethod
+    def snapshot(settings):
+        return SettingsSnapshot(
+            id=settings.id,
+            user_id=settings.user_id,
+            theme=settings.theme,
+            currency=settings.currency,
+            notifications_enabled=settings.notifications_enabled
+        )
+
+    @staticmethod
+    def invalidate_cached_settings(user_id):
+        settings_cache.invalidate(user_id)
+        if has_request_context():
+            g.setdefault('user_settings', {}).pop(user_id, None)
+
     @staticmethod
     def update_settings(user_id, settings_data):
         settings = UserSettings.query.filter_by(user_id=user_id).first()
@@ -209,6 +852,107 @@ class UserSettings(db.Model):
             for key, value in settings_data.items():
                 if hasattr(settings, key):
                     setattr(settings, key, value)
+            User.bump_data_version(user_id)
             db.session.commit()
+            UserSettings.invalidate_cached_settings(user_id)
             return True
-        return False
\ No newline at end of file
+        return False
+
+def ensure_columns():
+    """Add columns declared on the models but missing from existing tables"""
+    inspector = db.inspect(db.engine)
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                db.session.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN {column_ddl}'))
+                added.append(f"{table.name}.{column.name}")
+    db.session.commit()
+    return added
+
+def ensure_indexes():
+    """Create any declared indexes missing from an existing database"""
+    index_names = []
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+            index_names.append(index.name)
+    return index_names
+
+
+# Tables that held float amounts and category/type names before the compact layout
+COMPACT_STORAGE_TABLES = ('monthly_rollup', 'budget', 'saving_goal', 'transaction')
+
+def legacy_column_expression(column):
+    """SQL reading a compact-layout column's value from the matching legacy column"""
+    if isinstance(column.type, Cents):
+        return f'CAST(ROUND(ROUND("{column.key}", 2) * 100) AS INTEGER)'
+    if isinstance(column.type, LookupCode):
+        lookup_table = column.type.lookup.model.__tablename__
+        return f'(SELECT id FROM "{lookup_table}" WHERE name = "{column.key}")'
+    return f'"{column.name}"'
+
+def migrate_compact_storage(vacuum=False):
+    """Rewrite tables still using float amounts and name columns into cents and lookup codes"""
+    inspector = db.inspect(db.engine)
+    if not inspector.has_table('transaction'):
+        return []
+    if 'category' not in {column['name'] for column in inspector.get_columns('transaction')}:
+        return []
+
+    # Codes for every name in use, assigned alphabetically after the seeded ones
+    seed_lookups()
+    names = {'category': set(), 'type': set()}
+    for table_name in ('transaction', 'budget', 'monthly_rollup'):
+        legacy_columns = {column['name'] for column in inspector.get_columns(table_name)}
+        for column_name in names.keys() & legacy_columns:
+            names[column_name].update(db.session.execute(
+                text(f'SELECT DISTINCT "{column_name}" FROM "{table_name}"')
+            ).scalars())
+    category_codes.ensure(sorted(names['category']))
+    type_codes.ensure(sorted(names['type']))
+
+    # Move the old tables aside; their indexes go first so the new ones can reuse the names
+    legacy_columns = {}
+    for table_name in COMPACT_STORAGE_TABLES:
+        legacy_columns[table_name] = {column['name'] for column in inspector.get_columns(table_name)}
+        for index in inspector.get_indexes(table_name):
+            db.session.execute(text(f'DROP INDEX "{index["name"]}"'))
+        db.session.execute(text(f'ALTER TABLE "{table_name}" RENAME TO "{table_name}_legacy"'))
+    db.session.commit()
+    db.metadata.create_all(db.engine, tables=[db.metadata.tables[name] for name in COMPACT_STORAGE_TABLES])
+
+    migrated = []
+    for table_name in COMPACT_STORAGE_TABLES:
+        # Columns the legacy table never had keep their defaults
+        columns = [
+            column for column in db.metadata.tables[table_name].columns
+            if column.name in legacy_columns[table_name] or column.key in legacy_columns[table_name]
+        ]
+        column_names = ', '.join(f'"{column.name}"' for column in columns)
+        expressions = ', '.join(legacy_column_expression(column) for column in columns)
+        result = db.session.execute(text(
+            f'INSERT INTO "{table_name}" ({column_names}) SELECT {expressions} FROM "{table_name}_legacy"'
+        ))
+        db.session.execute(text(f'DROP TABLE "{table_name}_legacy"'))
+        migrated.append((table_name, result.rowcount))
+    db.session.commit()
+    if not ensure_search_index():
+        rebuild_search_index()
+    insights_cache.clear()
+
+    if vacuum:
+        with db.engine.connect() as connection:
+            connection.execution_options(isolation_level='AUTOCOMMIT').execute(text('VACUUM'))
+    return migrated
+
+def storage_sizes():
+    """Bytes used by each table and index, from SQLite's dbstat table"""
+    rows = db.session.execute(text(
+        'SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY SUM(pgsize) DESC'
+    )).all()
+    return dict(rows)
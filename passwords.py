@@ -0,0 +1,141 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask_bcrypt import Bcrypt
+
+BCRYPT_LOG_ROUNDS = 12
+PASSWORD_HASH_WORKERS = 2
+# Hash and check calls allowed in flight at once across all request threads
+PASSWORD_HASH_MAX_PENDING = 32
+# How long a call waits for a free slot before giving up with PasswordHasherBusy
+PASSWORD_HASH_WAIT_SECONDS = 5
+
+class PasswordHasherBusy(Exception):
+    """Every hashing slot stayed taken for longer than the configured wait"""
+
+# Module-level so the pool can pickle them; a fresh Bcrypt() needs no app
+def _hash_password(password, rounds, prefix):
+    return Bcrypt().generate_password_hash(password, rounds, prefix).decode('utf-8')
+
+def _check_password(password_hash, password):
+    return Bcrypt().check_password_hash(password_hash, password)
+
+def _worker_ready():
+    return True
+
+def hash_rounds(password_hash):
+    """The work factor stored in a bcrypt hash such as $2b$12$..."""
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+class PasswordHasher:
+    """Runs bcrypt in a small process pool behind a cap on calls in flight"""
+
+    def __init__(self):
+        self.mode = 'inline'
+        self.rounds = BCRYPT_LOG_ROUNDS
+        self.prefix = '2b'
+        self.workers = PASSWORD_HASH_WORKERS
+        self.wait_seconds = PASSWORD_HASH_WAIT_SECONDS
+        self.executor = None
+        self.calls = 0
+        self.rejected = 0
+        self.seconds = 0.0
+        self.in_flight = 0
+        self.restarts = 0
+        self._slots = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._forget_pool)
+
+    def init_app(self, app):
+        self.shutdown()
+        self.mode = app.config.get('PASSWORD_HASH_MODE', 'process')
+        # Same setting Flask-Bcrypt reads, so both agree on the work factor
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', BCRYPT_LOG_ROUNDS)
+        self.prefix = app.config.get('BCRYPT_HASH_PREFIX', '2b')
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', PASSWORD_HASH_WORKERS)
+        self.wait_seconds = app.config.get('PASSWORD_HASH_WAIT_SECONDS', PASSWORD_HASH_WAIT_SECONDS)
+        self._slots = threading.BoundedSemaphore(app.config.get('PASSWORD_HASH_MAX_PENDING', PASSWORD_HASH_MAX_PENDING))
+        # Spawned children would re-import the entry script and build a whole app each, so only fork is used
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            self.mode = 'inline'
+        if self.mode == 'process':
+            # Fork the workers now, while app creation is still single-threaded: a fork taken once request
+            # and job threads run can copy a lock one of them holds into a child that then never gets it
+            self._pool().submit(_worker_ready).result()
+
+    def _pool(self):
+        with self._lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('fork'))
+            return self.executor
+
+    def _forget_pool(self):
+        # A forked child, such as a preloading server's worker, cannot use its parent's pool; it builds its own
+        self.executor = None
+        self._lock = threading.Lock()
+
+    def _submit(self, fn, *args):
+        executor = self._pool()
+        try:
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. the OOM killer), which breaks the pool for good; replace it and retry once
+            with self._lock:
+                if self.executor is executor:
+                    self.executor = None
+                    self.restarts += 1
+            executor.shutdown(wait=False, cancel_futures=True)
+            return self._pool().submit(fn, *args).result()
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.wait_seconds):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy(f"No password hashing slot free after {self.wait_seconds}s")
+        started = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            if self.mode == 'process':
+                # The request thread just waits on the future, leaving the CPU to the pool
+                return self._submit(fn, *args)
+            return fn(*args)
+        finally:
+            self._slots.release()
+            with self._lock:
+                self.in_flight -= 1
+                self.calls += 1
+                self.seconds += time.perf_counter() - started
+
+    def hash(self, password):
+        return self._run(_hash_password, password, self.rounds, self.prefix)
+
+    def check(self, password_hash, password):
+        return self._run(_check_password, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return hash_rounds(password_hash) != self.rounds
+
+    def shutdown(self):
+        with self._lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'rejected': self.rejected,
+                'seconds': self.seconds,
+                'in_flight': self.in_flight,
+                'restarts': self.restarts
+            }
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,150 @@
+import datetime
+import time
+from collections import defaultdict, namedtuple
+from sqlalchemy.exc import IntegrityError
+from app import db
+from models import Transaction
+from insights_cache import insights_cache
+from utils import occurrences_between, next_occurrence, recurrence_date
+
+MATERIALIZE_BATCH_SIZE = 500
+# Caps one run's backfill for a long-dormant daily series; the next run continues from there
+MAX_OCCURRENCES_PER_SERIES = 1000
+MAX_PROJECTION_DAYS = 366 * 5
+
+# What materializing one series writes: new occurrence rows, existing rows to link, and where to resume
+SeriesPlan = namedtuple('SeriesPlan', ['series', 'rows', 'links', 'next_date'])
+
+def occurrence_row(series, date):
+    return {
+        'description': series.description,
+        'amount': series.amount,
+        'category': series.category,
+        'date': date,
+        'type': series.type,
+        'recurring': False,
+        'recurring_interval': None,
+        'series_id': series.id
+    }
+
+def occurrence_key(user_id, description, amount, category, transaction_type, date):
+    return (user_id, description, round(amount, 2), category, transaction_type, date)
+
+def plan_batch(batch, through):
+    """Plan each series in a batch, adopting matching unlinked rows instead of duplicating them"""
+    pending = []
+    for series in batch:
+        anchor, interval = series.date, series.recurring_interval
+        start = series.next_occurrence or recurrence_date(anchor, interval, 1)
+        dates = occurrences_between(anchor, interval, start, through, limit=MAX_OCCURRENCES_PER_SERIES)
+        # Resume after the last created occurrence, even when the per-run cap cut this one short
+        pending.append((series, dates, next_occurrence(anchor, interval, dates[-1] if dates else start - datetime.timedelta(days=1))))
+
+    # An imported export holds past occurrences as plain rows; one query per batch finds them
+    unlinked = defaultdict(list)
+    owed = [(series, dates) for series, dates, _ in pending if dates]
+    if owed:
+        for row in Transaction.get_unlinked_rows(
+            {series.user_id for series, _ in owed},
+            {series.description for series, _ in owed},
+            min(dates[0] for _, dates in owed)
+        ):
+            unlinked[occurrence_key(row.user_id, row.description, row.amount, row.category, row.type, row.date)].append(row.id)
+
+    plans = []
+    for series, dates, next_date in pending:
+        rows, links = [], []
+        for date in dates:
+            matches = unlinked.get(occurrence_key(
+                series.user_id, series.description, series.amount, series.category, series.type, date
+            ))
+            if matches:
+                links.append((matches.pop(), series.id, series.user_id))
+            else:
+                rows.append(occurrence_row(series, date))
+        plans.append(SeriesPlan(series, rows, links, next_date))
+    return plans
+
+def write_plans(plans):
+    # The unique (series_id, date) index rejects any occurrence another run already wrote
+    rows_by_user = defaultdict(list)
+    for plan in plans:
+        rows_by_user[plan.series.user_id].extend(plan.rows)
+    for series_user_id, rows in rows_by_user.items():
+        if rows:
+            Transaction.insert_rows(series_user_id, rows)
+    links = [link for plan in plans for link in plan.links]
+    if links:
+        Transaction.link_to_series(links)
+    Transaction.advance_series({plan.series.id: plan.next_date for plan in plans})
+
+def materialize_recurring(through=None, user_id=None, batch_size=MATERIALIZE_BATCH_SIZE):
+    """Create the transactions every recurring series owes up to `through`, one commit per batch"""
+    started = time.perf_counter()
+    through = through or datetime.date.today()
+    report = {'series': 0, 'created': 0, 'linked': 0, 'batches': 0, 'conflicts': 0}
+    after_id = 0
+
+    while True:
+        batch = Transaction.get_recurring_series(user_id, due_by=through, after_id=after_id, limit=batch_size)
+        if not batch:
+            break
+        after_id = batch[-1].id
+        plans = plan_batch(batch, through)
+
+        try:
+            with db.session.begin_nested():
+                write_plans(plans)
+            written = plans
+        except IntegrityError:
+            # Another run already materialized some of these periods and advanced those series;
+            # retry one series at a time so only the conflicting ones are skipped
+            written = []
+            for plan in plans:
+                try:
+                    with db.session.begin_nested():
+                        write_plans([plan])
+                    written.append(plan)
+                except IntegrityError:
+                    report['conflicts'] += 1
+        db.session.commit()
+
+        for series_user_id in {plan.series.user_id for plan in written if plan.rows or plan.links}:
+            insights_cache.invalidate(series_user_id)
+        report['series'] += len(written)
+        report['created'] += sum(len(plan.rows) for plan in written)
+        report['linked'] += sum(len(plan.links) for plan in written)
+        report['batches'] += 1
+
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    return report
+
+def project_recurring(user_id, start, end):
+    """Upcoming occurrences of a user's recurring series within [start, end], without writing rows"""
+    occurrences = []
+    for series in Transaction.get_recurring_series(user_id):
+        # Periods before next_occurrence already exist as real transactions
+        series_start = max(start, series.next_occurrence) if series.next_occurrence else start
+        for date in occurrences_between(series.date, series.recurring_interval, series_start, end):
+            occurrences.append({
+                'series_id': series.id,
+                'description': series.description,
+                'amount': series.amount,
+                'category': series.category,
+                'type': series.type,
+                'interval': series.recurring_interval,
+                'date': date.isoformat()
+            })
+    occurrences.sort(key=lambda occurrence: (occurrence['date'], occurrence['series_id']))
+
+    totals = defaultdict(float)
+    for occurrence in occurrences:
+        totals[occurrence['type']] += occurrence['amount']
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'occurrences': occurrences,
+        'total_income': totals['income'],
+        'total_expenses': totals['expense']
+    }
@@ -1,12 +1,48 @@
-from flask import render_template, redirect, url_for, flash, request, jsonify, session
+from flask import render_template, redirect, url_for, flash, request, jsonify, session, stream_with_context
 from flask_login import login_user, logout_user, current_user, login_required
-from app import app, db, bcrypt
+from app import app, db, bcrypt, use_read_replica
 from forms import RegistrationForm, LoginForm, TransactionForm, GoalForm, UpdateGoalForm, BudgetForm, SettingsForm
-from models import User, Transaction, SavingGoal, Budget, UserSettings
-from utils import calculate_budget_status, generate_insights, format_currency, calculate_monthly_expenses, calculate_category_expenses
+from models import MAX_CURSOR_AMOUNT, User, Transaction, TransactionFilter, SavingGoal, Budget, UserSettings, MonthlyRollup, settings_cache
+from loaders import load_dashboard, load_insights, load_derived_view, compute_derived_view
+from jobs import init_jobs
+from passwords import PasswordHasherBusy, password_hasher
+from insights_cache import configure_insights_cache
+from http_cache import conditional_view, page_cache
+from compression import init_compression
+from assets import init_assets
+from instrumentation import init_instrumentation, metrics
+from importer import IMPORT_CHUNK_SIZE, detect_format, import_transactions, iter_rows
+from recurring import MAX_PROJECTION_DAYS, project_recurring
+from search import SEARCH_PAGE_SIZE, MAX_SEARCH_PAGE_SIZE
+from utils import TIMESERIES_GRANULARITIES, build_timeseries, month_starts, calculate_budget_status, budget_period_starts, format_currency, calculate_monthly_expenses_from_rollups, calculate_category_expenses_from_rollups
+import csv
 import datetime
 import json
 import decimal
+import math
+import zlib
+from io import StringIO
+
+MAX_TIMESERIES_PERIODS = 5000
+MIN_PERIOD_DAYS = {'day': 1, 'week': 7, 'month': 28, 'quarter': 89, 'year': 365}
+TRANSACTIONS_PAGE_SIZE = 50
+MAX_TRANSACTIONS_PAGE_SIZE = 200
+INSIGHTS_PAGE_SIZE = 5000
+MAX_INSIGHTS_PAGE_SIZE = 20000
+EXPORT_BATCH_SIZE = 1000
+
+init_instrumentation(app)
+init_compression(app)
+init_assets(app)
+metrics.register_cache('settings', settings_cache)
+metrics.register_cache('pages', page_cache)
+metrics.register_cache('insights', configure_insights_cache(app))
+
+# Recompute derived views after writes so GET handlers can read them precomputed
+job_runner = init_jobs(app, compute_derived_view)
+if job_runner:
+    metrics.register_jobs(job_runner)
+metrics.register_passwords(password_hasher)
 
 # Helper function to handle datetime serialization for JSON
 def json_serialize_date(obj):
@@ -14,12 +50,106 @@ def json_serialize_date(obj):
         return obj.isoformat()
     raise TypeError(f"Type {type(obj)} not serializable")
 
+def serialize_transaction(t):
+    return {
+        'id': t.id,
+        'description': t.description,
+        'amount': t.amount,
+        'category': t.category,
+        'date': t.date.isoformat() if hasattr(t.date, 'isoformat') else str(t.date),
+        'type': t.type,
+        'recurring': t.recurring,
+        'recurring_interval': t.recurring_interval
+    }
+
+def encode_transaction_columns(rows):
+    # Parallel arrays per field instead of one object per row: dates are day deltas from the previous
+    # row (rows come oldest first) and categories/types index into per-response dictionaries
+    categories, types = {}, {}
+    dates, amounts, category_codes, type_codes, recurring = [], [], [], [], []
+    previous = rows[0].date if rows else None
+    for row in rows:
+        dates.append((row.date - previous).days)
+        previous = row.date
+        amounts.append(row.amount)
+        category_codes.append(categories.setdefault(row.category, len(categories)))
+        type_codes.append(types.setdefault(row.type, len(types)))
+        recurring.append(1 if row.recurring else 0)
+    return {
+        'date_origin': rows[0].date.isoformat() if rows else None,
+        'categories': list(categories),
+        'types': list(types),
+        'columns': {
+            'date': dates,
+            'amount': amounts,
+            'category': category_codes,
+            'type': type_codes,
+            'recurring': recurring
+        }
+    }
+
+def transaction_filter_args():
+    # Optional filters shared by the HTML and JSON transaction listings; malformed values raise ValueError
+    args = request.args
+    try:
+        start = datetime.date.fromisoformat(args['start']) if args.get('start') else None
+        end = datetime.date.fromisoformat(args['end']) if args.get('end') else None
+    except ValueError:
+        raise ValueError('start and end must be YYYY-MM-DD dates')
+    try:
+        min_amount = float(args['min_amount']) if args.get('min_amount') else None
+        max_amount = float(args['max_amount']) if args.get('max_amount') else None
+    except ValueError:
+        raise ValueError('min_amount and max_amount must be numbers')
+    if not all(math.isfinite(amount) for amount in (min_amount, max_amount) if amount is not None):
+        raise ValueError('min_amount and max_amount must be numbers')
+    # Bounds are bound as integer cents, which cannot hold anything larger
+    if not all(abs(amount) <= MAX_CURSOR_AMOUNT for amount in (min_amount, max_amount) if amount is not None):
+        raise ValueError(f"min_amount and max_amount must be between -{MAX_CURSOR_AMOUNT:,} and {MAX_CURSOR_AMOUNT:,}")
+    transaction_type = args.get('type') or None
+    if transaction_type not in (None, 'income', 'expense'):
+        raise ValueError('type must be income or expense')
+    if start and end and start > end:
+        raise ValueError('start must not be after end')
+    if min_amount is not None and max_amount is not None and min_amount > max_amount:
+        raise ValueError('min_amount must not be above max_amount')
+    return TransactionFilter(
+        start=start,
+        end=end,
+        categories=tuple(sorted({category for category in args.getlist('category') if category})),
+        type=transaction_type,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        recurring_only=args.get('recurring') in ('1', 'true', 'on')
+    )
+
+def transaction_page_args():
+    # Shared query parameters for the HTML and JSON transaction listings
+    sort_by = request.args.get('sort_by', 'date')
+    if sort_by not in ('date', 'amount', 'category'):
+        sort_by = 'date'
+    sort_order = 1 if request.args.get('sort_order') == '1' else -1
+    page_size = request.args.get('limit', app.config.get('TRANSACTIONS_PAGE_SIZE', TRANSACTIONS_PAGE_SIZE), type=int)
+    page_size = max(1, min(page_size, MAX_TRANSACTIONS_PAGE_SIZE))
+    return {
+        'page_size': page_size,
+        'sort_by': sort_by,
+        'sort_order': sort_order,
+        'cursor': request.args.get('cursor') or None,
+        'filters': transaction_filter_args()
+    }
+
 @app.route('/')
 def index():
     if current_user.is_authenticated:
         return redirect(url_for('dashboard'))
     return render_template('index.html', title='Personal Finance Tracker')
 
+@app.route('/metrics')
+def metrics_endpoint():
+    # Prometheus scrape target for request latency, query and cache metrics
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
@@ -27,11 +157,15 @@ def register():
     
     form = RegistrationForm()
     if form.validate_on_submit():
-        user_id = User.create_user(
-            username=form.username.data,
-            email=form.email.data,
-            password=form.password.data
-        )
+        try:
+            user_id = User.create_user(
+                username=form.username.data,
+                email=form.email.data,
+                password=form.password.data
+            )
+        except PasswordHasherBusy:
+            flash('We are handling a lot of sign-ups right now. Please try again in a moment.', 'warning')
+            return render_template('register.html', title='Register', form=form), 503, {'Retry-After': '5'}
         flash('Your account has been created! You can now log in.', 'success')
         return redirect(url_for('login'))
     
@@ -45,7 +179,12 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
-        if user and User.check_password(user, form.password.data):
+        try:
+            password_ok = User.check_password(user, form.password.data)
+        except PasswordHasherBusy:
+            flash('We are handling a lot of logins right now. Please try again in a moment.', 'warning')
+            return render_template('login.html', title='Login', form=form), 503, {'Retry-After': '5'}
+        if password_ok:
             login_user(user)
             
             # Initialize user settings if not exists
@@ -66,53 +205,34 @@ def logout():
 
 @app.route('/dashboard')
 @login_required
+@use_read_replica
+@conditional_view
 def dashboard():
-    # Get user's transactions
-    recent_transactions = Transaction.get_transactions(current_user.id, limit=5)
-    
-    # Calculate financial summary
-    all_transactions = Transaction.get_transactions(current_user.id)
-    total_income = sum(t.amount for t in all_transactions if t.type == 'income')
-    total_expenses = sum(t.amount for t in all_transactions if t.type == 'expense')
-    current_balance = total_income - total_expenses
-    
-    # Get category expense data for charts
-    category_expenses = calculate_category_expenses(all_transactions)
-    
-    # Get monthly expense data for charts
-    monthly_expenses = calculate_monthly_expenses(all_transactions)
-    
-    # Get user's saving goals
-    goals = SavingGoal.get_goals(current_user.id)
-    
-    # Get budget status
-    budgets = Budget.get_budgets(current_user.id)
-    budget_status = calculate_budget_status(budgets, all_transactions)
+    # Load all dashboard data in a bounded number of queries
+    data = load_dashboard(current_user.id, current_user.data_version)
     
     # Get user settings for currency formatting
-    settings = UserSettings.get_settings(current_user.id)
-    
-    # Generate insights
-    insights = generate_insights(all_transactions, budgets)
+    settings = UserSettings.get_cached_settings(current_user.id)
     
     return render_template(
         'dashboard.html',
         title='Dashboard',
-        recent_transactions=recent_transactions,
-        total_income=total_income,
-        total_expenses=total_expenses,
-        current_balance=current_balance,
-        category_expenses=json.dumps(category_expenses, default=json_serialize_date),
-        monthly_expenses=json.dumps(monthly_expenses, default=json_serialize_date),
-        goals=goals,
-        budget_status=budget_status,
-        insights=insights,
+        recent_transactions=data['recent_transactions'],
+        total_income=data['total_income'],
+        total_expenses=data['total_expenses'],
+        current_balance=data['current_balance'],
+        category_expenses=json.dumps(data['category_expenses'], default=json_serialize_date),
+        monthly_expenses=json.dumps(data['monthly_expenses'], default=json_serialize_date),
+        goals=data['goals'],
+        budget_status=data['budget_status'],
+        insights=data['insights'],
         format_currency=lambda amount: format_currency(amount, settings.currency if settings else 'USD'),
         settings=settings
     )
 
 @app.route('/transactions', methods=['GET', 'POST'])
 @login_required
+@use_read_replica
 def transactions():
     form = TransactionForm()
     
@@ -130,21 +250,123 @@ def transactions():
         flash('Transaction added successfully!', 'success')
         return redirect(url_for('transactions'))
     
-    # Get all transactions
-    user_transactions = Transaction.get_transactions(current_user.id)
+    # Get one page of transactions plus totals over everything the filters match
+    try:
+        page_args = transaction_page_args()
+        user_transactions, next_cursor, totals = Transaction.get_transactions_page(current_user.id, **page_args)
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('transactions'))
     
     # Get user settings for currency formatting
-    settings = UserSettings.get_settings(current_user.id)
+    settings = UserSettings.get_cached_settings(current_user.id)
     
     return render_template(
         'transactions.html',
         title='Transactions',
         form=form,
         transactions=user_transactions,
+        next_cursor=next_cursor,
+        totals=totals,
+        filters=page_args['filters'],
+        sort_by=page_args['sort_by'],
+        sort_order=page_args['sort_order'],
         format_currency=lambda amount: format_currency(amount, settings.currency if settings else 'USD'),
         settings=settings
     )
 
+@app.route('/api/transactions')
+@login_required
+@use_read_replica
+def api_transactions():
+    try:
+        user_transactions, next_cursor, totals = Transaction.get_transactions_page(current_user.id, **transaction_page_args())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'transactions': [serialize_transaction(t) for t in user_transactions],
+        'next_cursor': next_cursor,
+        'totals': totals
+    })
+
+@app.route('/api/transactions/search')
+@login_required
+@use_read_replica
+def api_search_transactions():
+    # Ranked prefix search over descriptions and categories, paged with an opaque cursor
+    query = request.args.get('q', '')
+    page_size = request.args.get('limit', SEARCH_PAGE_SIZE, type=int)
+    page_size = max(1, min(page_size, MAX_SEARCH_PAGE_SIZE))
+    try:
+        matches, next_cursor = Transaction.search_page(
+            current_user.id, query, page_size, request.args.get('cursor') or None
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'query': query,
+        'transactions': [serialize_transaction(t) for t in matches],
+        'next_cursor': next_cursor
+    })
+
+@app.route('/api/timeseries')
+@login_required
+@use_read_replica
+def api_timeseries():
+    today = datetime.date.today()
+    granularity = request.args.get('granularity', 'month')
+    transaction_type = request.args.get('type') or None
+    category = request.args.get('category') or None
+    
+    try:
+        end = datetime.date.fromisoformat(request.args['end']) if request.args.get('end') else today
+        start = datetime.date.fromisoformat(request.args['start']) if request.args.get('start') else month_starts(end)[0]
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD dates'}), 400
+    
+    if granularity not in TIMESERIES_GRANULARITIES:
+        return jsonify({'error': f"granularity must be one of {', '.join(TIMESERIES_GRANULARITIES)}"}), 400
+    if transaction_type not in (None, 'income', 'expense'):
+        return jsonify({'error': 'type must be income or expense'}), 400
+    if start > end:
+        return jsonify({'error': 'start must not be after end'}), 400
+    if (end - start).days // MIN_PERIOD_DAYS[granularity] > MAX_TIMESERIES_PERIODS:
+        return jsonify({'error': 'Range is too large for this granularity'}), 400
+    
+    rows = Transaction.get_timeseries(current_user.id, start, end, granularity, category, transaction_type)
+    transaction_types = (transaction_type,) if transaction_type else ('income', 'expense')
+    return jsonify(build_timeseries(rows, start, end, granularity, transaction_types))
+
+@app.route('/api/recurring/projection')
+@login_required
+@use_read_replica
+def api_recurring_projection():
+    # Upcoming occurrences of recurring transactions, computed without creating them
+    today = datetime.date.today()
+    try:
+        days = int(request.args.get('days', 90))
+    except ValueError:
+        return jsonify({'error': 'days must be a whole number'}), 400
+    if not 0 <= days <= MAX_PROJECTION_DAYS:
+        return jsonify({'error': f'days must be between 0 and {MAX_PROJECTION_DAYS}'}), 400
+    
+    try:
+        start = datetime.date.fromisoformat(request.args['start']) if request.args.get('start') else today + datetime.timedelta(days=1)
+        end = datetime.date.fromisoformat(request.args['end']) if request.args.get('end') else start + datetime.timedelta(days=days)
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD dates'}), 400
+    except OverflowError:
+        return jsonify({'error': 'start is too close to the end of the calendar to project from'}), 400
+    
+    if start > end:
+        return jsonify({'error': 'start must not be after end'}), 400
+    if (end - start).days > MAX_PROJECTION_DAYS:
+        return jsonify({'error': f'Projection horizon is limited to {MAX_PROJECTION_DAYS} days'}), 400
+    
+    return jsonify(project_recurring(current_user.id, start, end))
+
 @app.route('/delete_transaction/<transaction_id>', methods=['POST'])
 @login_required
 def delete_transaction(transaction_id):
@@ -156,6 +378,8 @@ def delete_transaction(transaction_id):
 
 @app.route('/goals', methods=['GET', 'POST'])
 @login_required
+@use_read_replica
+@conditional_view
 def goals():
     form = GoalForm()
     update_form = UpdateGoalForm()
@@ -175,7 +399,7 @@ def goals():
     user_goals = SavingGoal.get_goals(current_user.id)
     
     # Get user settings for currency formatting
-    settings = UserSettings.get_settings(current_user.id)
+    settings = UserSettings.get_cached_settings(current_user.id)
     
     return render_template(
         'goals.html',
@@ -213,6 +437,8 @@ def delete_goal(goal_id):
 
 @app.route('/budget', methods=['GET', 'POST'])
 @login_required
+@use_read_replica
+@conditional_view
 def budget():
     form = BudgetForm()
     
@@ -242,13 +468,17 @@ def budget():
         
         return redirect(url_for('budget'))
     
-    # Get all budgets and calculate status
+    # Get all budgets and their status, precomputed when no write has landed since
     user_budgets = Budget.get_budgets(current_user.id)
-    all_transactions = Transaction.get_transactions(current_user.id)
-    budget_status = calculate_budget_status(user_budgets, all_transactions)
+    derived = load_derived_view(current_user.id, current_user.data_version)
+    if derived:
+        budget_status = derived['budget_status']
+    else:
+        spending = Transaction.get_period_spending(current_user.id, budget_period_starts())
+        budget_status = calculate_budget_status(user_budgets, spending)
     
     # Get user settings for currency formatting
-    settings = UserSettings.get_settings(current_user.id)
+    settings = UserSettings.get_cached_settings(current_user.id)
     
     return render_template(
         'budget.html',
@@ -271,22 +501,24 @@ def delete_budget(budget_id):
 
 @app.route('/insights')
 @login_required
+@use_read_replica
+@conditional_view
 def insights():
-    # Get all transactions
-    all_transactions = Transaction.get_transactions(current_user.id)
-    
-    # Get all budgets
-    budgets = Budget.get_budgets(current_user.id)
-    
-    # Generate insights
-    insights_data = generate_insights(all_transactions, budgets)
+    # Chart data is fetched per date range from /api/insights/transactions, not embedded in the page
+    # Use the precomputed insights and chart data, or derive them from the monthly rollups
+    derived = load_derived_view(current_user.id, current_user.data_version)
+    if derived:
+        insights_data = derived['insights']
+        category_expenses = derived['category_expenses']
+        monthly_expenses = derived['monthly_expenses']
+    else:
+        rollups = MonthlyRollup.get_rollups(current_user.id)
+        insights_data = load_insights(current_user.id, current_user.data_version, rollups)
+        category_expenses = calculate_category_expenses_from_rollups(rollups)
+        monthly_expenses = calculate_monthly_expenses_from_rollups(rollups)
     
     # Get user settings for currency formatting
-    settings = UserSettings.get_settings(current_user.id)
-    
-    # Get category expense data and monthly expense data for the charts
-    category_expenses = calculate_category_expenses(all_transactions)
-    monthly_expenses = calculate_monthly_expenses(all_transactions)
+    settings = UserSettings.get_cached_settings(current_user.id)
     
     return render_template(
         'insights.html',
@@ -294,24 +526,32 @@ def insights():
         insights=insights_data,
         category_expenses=json.dumps(category_expenses, default=json_serialize_date),
         monthly_expenses=json.dumps(monthly_expenses, default=json_serialize_date),
-        transactions=json.dumps([{
-            'id': t.id,
-            'description': t.description,
-            'amount': t.amount,
-            'category': t.category,
-            'date': t.date.isoformat() if hasattr(t.date, 'isoformat') else t.date,
-            'type': t.type,
-            'recurring': t.recurring
-        } for t in all_transactions], default=json_serialize_date),
         format_currency=lambda amount: format_currency(amount, settings.currency if settings else 'USD'),
         settings=settings
     )
 
+@app.route('/api/insights/transactions')
+@login_required
+@use_read_replica
+@conditional_view
+def api_insights_transactions():
+    # Columnar pages, oldest first, of just the range (and filters) the insights charts are drawing
+    page_size = request.args.get('limit', INSIGHTS_PAGE_SIZE, type=int)
+    page_size = max(1, min(page_size, MAX_INSIGHTS_PAGE_SIZE))
+    try:
+        rows, next_cursor = Transaction.get_chart_rows(
+            current_user.id, page_size, transaction_filter_args(), request.args.get('cursor') or None
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(dict(encode_transaction_columns(rows), rows=len(rows), next_cursor=next_cursor))
+
 @app.route('/settings', methods=['GET', 'POST'])
 @login_required
 def settings():
     # Get current settings
-    user_settings = UserSettings.get_settings(current_user.id)
+    user_settings = UserSettings.get_cached_settings(current_user.id)
     
     form = SettingsForm(obj=user_settings)
     
@@ -344,73 +584,69 @@ def settings():
         settings=user_settings
     )
 
-@app.route('/export_data')
-@login_required
-def export_data():
-    # Get all user data
-    transactions = Transaction.get_transactions(current_user.id)
-    goals = SavingGoal.get_goals(current_user.id)
-    budgets = Budget.get_budgets(current_user.id)
-    
-    # Create export data object with serializable data
-    export_data = {
-        'transactions': [{
-            'id': t.id,
-            'description': t.description,
-            'amount': t.amount,
-            'category': t.category,
-            'date': t.date.isoformat() if hasattr(t.date, 'isoformat') else str(t.date),
-            'type': t.type,
-            'recurring': t.recurring,
-            'recurring_interval': t.recurring_interval
-        } for t in transactions],
-        'goals': [{
-            'id': g.id,
-            'name': g.name,
-            'target_amount': g.target_amount,
-            'current_amount': g.current_amount,
-            'deadline': g.deadline.isoformat() if hasattr(g.deadline, 'isoformat') else str(g.deadline)
-        } for g in goals],
-        'budgets': [{
-            'id': b.id,
-            'category': b.category,
-            'limit_amount': b.limit_amount,
-            'period': b.period
-        } for b in budgets],
-        'exported_at': datetime.datetime.utcnow().isoformat()
-    }
-    
-    # Convert dates to string for JSON serialization
-    json_data = json.dumps(export_data, default=json_serialize_date)
-    
-    # Return as JSON download
-    response = app.response_class(
-        response=json_data,
-        status=200,
-        mimetype='application/json'
-    )
-    response.headers["Content-Disposition"] = "attachment; filename=finance_data.json"
-    
+def batched_chunks(pieces, batch_size=EXPORT_BATCH_SIZE):
+    # Join small string pieces so the response is sent in reasonably sized chunks
+    batch = []
+    for piece in pieces:
+        batch.append(piece)
+        if len(batch) >= batch_size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_response(chunks, mimetype, filename):
+    # Stream the export, gzip-compressed when the client asks for ?gzip=1
+    if request.args.get('gzip') == '1':
+        response = app.response_class(stream_with_context(gzip_stream(chunks)), mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = app.response_class(stream_with_context(chunks), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}"
     return response
 
-@app.route('/export_csv')
-@login_required
-def export_csv():
-    import csv
-    from io import StringIO
-    
-    # Get all transactions
-    transactions = Transaction.get_transactions(current_user.id)
+def export_json_chunks(user_id):
+    yield '{"transactions": ['
+    yield from batched_chunks(
+        (',' if index else '') + json.dumps(serialize_transaction(t))
+        for index, t in enumerate(Transaction.iter_transactions(user_id, EXPORT_BATCH_SIZE))
+    )
     
-    # Create CSV in memory
-    output = StringIO()
-    writer = csv.writer(output)
+    goals = [{
+        'id': g.id,
+        'name': g.name,
+        'target_amount': g.target_amount,
+        'current_amount': g.current_amount,
+        'deadline': g.deadline.isoformat() if hasattr(g.deadline, 'isoformat') else str(g.deadline)
+    } for g in SavingGoal.get_goals(user_id)]
+    budgets = [{
+        'id': b.id,
+        'category': b.category,
+        'limit_amount': b.limit_amount,
+        'period': b.period
+    } for b in Budget.get_budgets(user_id)]
+    
+    yield '], "goals": ' + json.dumps(goals)
+    yield ', "budgets": ' + json.dumps(budgets)
+    yield ', "exported_at": ' + json.dumps(datetime.datetime.utcnow().isoformat()) + '}'
+
+def export_csv_chunks(user_id):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
     
     # Write header
     writer.writerow(['Date', 'Description', 'Category', 'Type', 'Amount', 'Recurring'])
     
-    # Write transactions
-    for transaction in transactions:
+    # Write transactions, flushing the buffer every batch
+    for index, transaction in enumerate(Transaction.iter_transactions(user_id, EXPORT_BATCH_SIZE), 1):
         writer.writerow([
             transaction.date.strftime('%Y-%m-%d') if hasattr(transaction.date, 'strftime') else str(transaction.date),
             transaction.description,
@@ -419,21 +655,55 @@ def export_csv():
             transaction.amount,
             'Yes' if transaction.recurring else 'No'
         ])
+        if index % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
     
-    # Return as CSV download
-    response = app.response_class(
-        response=output.getvalue(),
-        status=200,
-        mimetype='text/csv'
-    )
-    response.headers["Content-Disposition"] = "attachment; filename=transactions.csv"
-    
-    return response
+    yield buffer.getvalue()
+
+@app.route('/export_data')
+@login_required
+@use_read_replica
+def export_data():
+    # Stream all user data as JSON without building it in memory
+    return export_response(export_json_chunks(current_user.id), 'application/json', 'finance_data.json')
+
+@app.route('/export_csv')
+@login_required
+@use_read_replica
+def export_csv():
+    # Stream transactions as CSV without building the file in memory
+    return export_response(export_csv_chunks(current_user.id), 'text/csv', 'transactions.csv')
+
+@app.route('/import', methods=['POST'])
+@login_required
+def import_data():
+    # Accepts the export_csv or export_data file format as an upload
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({'error': 'No file uploaded'}), 400
+    
+    file_format = detect_format(upload.filename, request.form.get('format'))
+    chunk_size = request.form.get('chunk_size', app.config.get('IMPORT_CHUNK_SIZE', IMPORT_CHUNK_SIZE), type=int)
+    chunk_size = max(1, min(chunk_size, 10000))
+    
+    report = import_transactions(current_user.id, iter_rows(upload.stream, file_format), chunk_size)
+    return jsonify(report)
 
 # Set theme preference in session for all routes
 @app.before_request
 def before_request():
+    # Static files must not load the user or touch the session, which would add Set-Cookie and Vary: Cookie
+    if request.endpoint == 'static':
+        return
     if current_user.is_authenticated:
-        settings = UserSettings.get_settings(current_user.id)
+        settings = UserSettings.get_cached_settings(current_user.id)
         if settings:
-            session['theme'] = settings.theme
\ No newline at end of file
+            session['theme'] = settings.theme
+
+# The async read API is optional; it is only served when aiosqlite and asgiref are installed
+try:
+    import async_api  # noqa: F401
+except ImportError as e:
+    app.logger.info("Async read API disabled: %s", e)
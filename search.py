@@ -0,0 +1,92 @@
+import re
+from sqlalchemy import Float, Integer, column, text
+from app import db
+
+SEARCH_TABLE = 'transaction_search'
+SEARCH_PAGE_SIZE = 25
+MAX_SEARCH_PAGE_SIZE = 100
+MAX_SEARCH_TERMS = 8
+# Relative bm25 weights: a hit in the description counts for more than one in the category
+DESCRIPTION_WEIGHT = 2.0
+CATEGORY_WEIGHT = 1.0
+
+# The owner column holds a single "u<id>" token so each query only walks that user's postings;
+# prefix indexes keep short search-as-you-type prefixes cheap
+SEARCH_DDL = f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+    owner, description, category, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+)"""
+
+# Kept in sync from the write helpers rather than triggers: FTS5 inserts fired from a trigger cost
+# several times a direct executemany and made bulk imports over twice as slow
+INDEX_ROW = f"INSERT INTO {SEARCH_TABLE} (rowid, owner, description, category) VALUES (?, ?, ?, ?)"
+UNINDEX_ROW = f"DELETE FROM {SEARCH_TABLE} WHERE rowid = ?"
+
+TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+def match_expression(query):
+    """FTS5 query for the words in free text, each matched as a prefix; None if there are none"""
+    # Quoting every term keeps FTS5 operators and punctuation in user input from being parsed
+    terms = TERM_PATTERN.findall(query or '')[:MAX_SEARCH_TERMS]
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def ensure_search_index():
+    """Create the search table, filling it if it is new"""
+    inspector = db.inspect(db.engine)
+    # Legacy-layout databases get the index after migrate_compact_storage
+    if 'category_id' not in {info['name'] for info in inspector.get_columns('transaction')}:
+        return False
+    created = not inspector.has_table(SEARCH_TABLE)
+    db.session.execute(text(SEARCH_DDL))
+    if created:
+        fill_search_index()
+    db.session.commit()
+    return created
+
+def fill_search_index():
+    return db.session.execute(text(f"""
+        INSERT INTO {SEARCH_TABLE} (rowid, owner, description, category)
+        SELECT t.id, 'u' || t.user_id, t.description, c.name
+        FROM "transaction" AS t JOIN category AS c ON c.id = t.category_id
+    """)).rowcount
+
+def rebuild_search_index():
+    """Refill the search table from the transaction table"""
+    db.session.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    rows = fill_search_index()
+    db.session.commit()
+    return rows
+
+def index_transactions(connection, rows):
+    """Add (id, user_id, description, category) rows to the search table in the caller's transaction"""
+    # Plain DBAPI parameters: nothing here needs type processing and bulk imports pass 100k rows
+    if rows:
+        connection.exec_driver_sql(INDEX_ROW, [
+            (transaction_id, f"u{user_id}", description, category)
+            for transaction_id, user_id, description, category in rows
+        ])
+
+def unindex_transactions(connection, transaction_ids):
+    if transaction_ids:
+        connection.exec_driver_sql(UNINDEX_ROW, [(transaction_id,) for transaction_id in transaction_ids])
+
+def search_matches(user_id, expression, limit, after=None):
+    """Subquery of (rowid, score) for one page of a user's matches, best first"""
+    score = f"bm25({SEARCH_TABLE}, 0.0, {DESCRIPTION_WEIGHT}, {CATEGORY_WEIGHT})"
+    params = {
+        'match': f'owner : "u{int(user_id)}" AND {{description category}} : ({expression})',
+        'limit': limit
+    }
+    # Lower bm25 is better; equal scores fall back to newest id first
+    keyset = ''
+    if after is not None:
+        keyset = 'WHERE score > :after_score OR (score = :after_score AND rowid < :after_id)'
+        params.update(after_score=after[0], after_id=after[1])
+    statement = text(f"""
+        SELECT rowid, score FROM (
+            SELECT rowid, {score} AS score FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match
+        ) {keyset}
+        ORDER BY score, rowid DESC LIMIT :limit
+    """).bindparams(**params)
+    return statement.columns(column('rowid', Integer), column('score', Float)).subquery('matches')
@@ -0,0 +1,133 @@
+// Columnar transaction data for the insights charts, fetched only for the range being drawn
+const insightRanges = {};
+const insightCharts = {};
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+function localIsoDate(date) {
+    const month = String(date.getMonth() + 1).padStart(2, '0');
+    const day = String(date.getDate()).padStart(2, '0');
+    return `${date.getFullYear()}-${month}-${day}`;
+}
+
+function insightRange(months) {
+    // Whole calendar months ending today; 0 means the full history
+    if (!months) return { start: '', end: '' };
+    const today = new Date();
+    const start = new Date(today.getFullYear(), today.getMonth() - months + 1, 1);
+    return { start: localIsoDate(start), end: localIsoDate(today) };
+}
+
+async function loadTransactionColumns(start, end) {
+    const rows = { time: [], amount: [], category: [], type: [], recurring: [] };
+    let cursor = null;
+    do {
+        const params = new URLSearchParams();
+        if (start) params.set('start', start);
+        if (end) params.set('end', end);
+        if (cursor) params.set('cursor', cursor);
+        const response = await fetch(`/api/insights/transactions?${params}`);
+        if (!response.ok) throw new Error(`Failed to load transactions (${response.status})`);
+        const page = await response.json();
+        // Undo the delta-encoded dates and the per-page category/type dictionaries
+        let time = page.date_origin ? Date.parse(page.date_origin) : 0;
+        const columns = page.columns;
+        for (let i = 0; i < page.rows; i++) {
+            time += columns.date[i] * DAY_MS;
+            rows.time.push(time);
+            rows.amount.push(columns.amount[i]);
+            rows.category.push(page.categories[columns.category[i]]);
+            rows.type.push(page.types[columns.type[i]]);
+            rows.recurring.push(columns.recurring[i] === 1);
+        }
+        cursor = page.next_cursor;
+    } while (cursor);
+    return rows;
+}
+
+function fetchTransactionColumns(start, end) {
+    // Each range is fetched once per page view; switching back reuses it
+    const key = `${start}:${end}`;
+    if (!insightRanges[key]) {
+        insightRanges[key] = loadTransactionColumns(start, end).catch(error => {
+            delete insightRanges[key];
+            throw error;
+        });
+    }
+    return insightRanges[key];
+}
+
+function summarizeTransactionColumns(rows) {
+    const months = {};
+    const categories = {};
+    rows.time.forEach((time, i) => {
+        // Date.parse reads YYYY-MM-DD as UTC midnight, so slice the UTC form back out
+        const month = new Date(time).toISOString().slice(0, 7);
+        const bucket = months[month] || (months[month] = { income: 0, expense: 0 });
+        const type = rows.type[i];
+        if (type in bucket) bucket[type] += rows.amount[i];
+        if (type === 'expense') {
+            categories[rows.category[i]] = (categories[rows.category[i]] || 0) + rows.amount[i];
+        }
+    });
+    const monthLabels = Object.keys(months).sort();
+    const categoryLabels = Object.keys(categories).sort((a, b) => categories[b] - categories[a]);
+    return {
+        months: {
+            labels: monthLabels,
+            income: monthLabels.map(month => months[month].income),
+            expense: monthLabels.map(month => months[month].expense)
+        },
+        categories: {
+            labels: categoryLabels,
+            data: categoryLabels.map(category => categories[category])
+        }
+    };
+}
+
+function drawInsightChart(id, config) {
+    const canvas = document.getElementById(id);
+    if (!window.Chart || !canvas) return;
+    if (insightCharts[id]) insightCharts[id].destroy();
+    insightCharts[id] = new Chart(canvas.getContext('2d'), config);
+}
+
+function renderInsightCharts(months) {
+    const { start, end } = insightRange(months);
+    const status = document.getElementById('insightChartStatus');
+    status.textContent = 'Loading...';
+    fetchTransactionColumns(start, end)
+        .then(rows => {
+            // Drop results for a range the user has since moved away from
+            if (String(months) !== document.getElementById('insightRange').value) return;
+            const summary = summarizeTransactionColumns(rows);
+            status.textContent = `${rows.time.length} transactions`;
+            drawInsightChart('insightMonthlyChart', {
+                type: 'bar',
+                data: {
+                    labels: summary.months.labels,
+                    datasets: [
+                        { label: 'Income', data: summary.months.income, backgroundColor: '#4BC0C0' },
+                        { label: 'Expenses', data: summary.months.expense, backgroundColor: '#FF6384' }
+                    ]
+                }
+            });
+            drawInsightChart('insightCategoryChart', {
+                type: 'pie',
+                data: {
+                    labels: summary.categories.labels,
+                    datasets: [{
+                        data: summary.categories.data,
+                        backgroundColor: ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40']
+                    }]
+                }
+            });
+        })
+        .catch(error => { status.textContent = error.message; });
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    const range = document.getElementById('insightRange');
+    if (!range) return;
+    range.addEventListener('change', () => renderInsightCharts(Number(range.value)));
+    renderInsightCharts(Number(range.value));
+});
\ No newline at end of file
@@ -45,4 +45,80 @@ function renderTransactions() {
     });
 }
 
+// Same symbols and rounding as format_currency in utils.py, so fetched rows match server-rendered ones
+const CURRENCY_SYMBOLS = { USD: '$', EUR: '€', GBP: '£', JPY: '¥', CAD: 'CA$', AUD: 'A$' };
+
+function formatCurrency(amount, currencyCode = 'USD') {
+    const symbol = CURRENCY_SYMBOLS[currencyCode] || '$';
+    if (currencyCode === 'JPY') {
+        return `${symbol}${Math.trunc(amount).toLocaleString('en-US')}`;
+    }
+    return `${symbol}${amount.toLocaleString('en-US', { minimumFractionDigits: 2, maximumFractionDigits: 2 })}`;
+}
+
+function transactionListItem(transaction, currencyCode) {
+    const li = document.createElement('li');
+    li.className = `list-group-item transaction-row ${transaction.type}`;
+    li.innerHTML = `
+        <div class="d-flex w-100 justify-content-between">
+            <h6 class="mb-1"></h6>
+            <span class="transaction-amount ${transaction.type}">${formatCurrency(transaction.amount, currencyCode)}</span>
+        </div>
+        <div class="d-flex justify-content-between">
+            <small class="transaction-category"></small>
+            <small class="transaction-date text-muted">${transaction.date}</small>
+        </div>
+    `;
+    li.querySelector('h6').textContent = transaction.description;
+    li.querySelector('.transaction-category').textContent = transaction.category;
+    return li;
+}
+
+function loadMoreTransactions(button) {
+    const history = document.getElementById('transactionHistory');
+    // Keep the page's filters so the next page continues the same filtered listing
+    const params = new URLSearchParams(window.location.search);
+    params.set('cursor', button.dataset.cursor);
+    params.set('sort_by', button.dataset.sortBy);
+    params.set('sort_order', button.dataset.sortOrder);
+    button.disabled = true;
+    fetch(`/api/transactions?${params}`)
+        .then(response => response.json())
+        .then(page => {
+            page.transactions.forEach(transaction => history.appendChild(transactionListItem(transaction, history.dataset.currency)));
+            if (page.next_cursor) {
+                button.dataset.cursor = page.next_cursor;
+                button.disabled = false;
+            } else {
+                button.remove();
+            }
+        })
+        .catch(() => { button.disabled = false; });
+}
+
+function searchTransactions(cursor) {
+    const query = document.getElementById('transactionSearchQuery').value;
+    const results = document.getElementById('transactionSearchResults');
+    const more = document.getElementById('transactionSearchMore');
+    const params = new URLSearchParams({ q: query });
+    if (cursor) {
+        params.set('cursor', cursor);
+    } else {
+        results.innerHTML = '';
+    }
+    more.classList.add('d-none');
+    fetch(`/api/transactions/search?${params}`)
+        .then(response => response.json())
+        .then(page => {
+            // Drop responses for a query the user has since changed
+            if (query !== document.getElementById('transactionSearchQuery').value) return;
+            page.transactions.forEach(transaction => results.appendChild(transactionListItem(transaction, results.dataset.currency)));
+            if (page.next_cursor) {
+                more.dataset.cursor = page.next_cursor;
+                more.classList.remove('d-none');
+            }
+        });
+    return false;
+}
+
 document.addEventListener('DOMContentLoaded', renderTransactions);
\ No newline at end of file
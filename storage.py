@@ -0,0 +1,137 @@
+import math
+import threading
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import event, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+
+# Names seeded in alphabetical order so code order matches name order; matches TransactionForm/BudgetForm choices
+SEEDED_CATEGORIES = (
+    'education', 'entertainment', 'food', 'healthcare', 'housing', 'income',
+    'investments', 'other', 'personal', 'transportation', 'utilities'
+)
+SEEDED_TRANSACTION_TYPES = ('expense', 'income')
+
+CENT = Decimal('0.01')
+# Largest amount stored: integer cents top out at 2**63 - 1, and the headroom keeps a user's SUM()s from overflowing
+MAX_AMOUNT = 10 ** 12
+
+class Cents(db.TypeDecorator):
+    """Float amounts in Python, integer minor units in the database so sums are exact"""
+    impl = db.Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        value = float(value)
+        if not math.isfinite(value) or abs(value) > MAX_AMOUNT:
+            raise ValueError(f"Amount {value!r} is outside the storable range of +/-{MAX_AMOUNT:,}")
+        # Rounds the decimal the user typed, half away from zero, like SQLite's ROUND(x, 2) in the migration
+        return int(Decimal(repr(value)).quantize(CENT, rounding=ROUND_HALF_UP) * 100)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return value / 100
+
+# Integer rather than SmallInteger keys so SQLite aliases them to the rowid and assigns them
+class Category(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+
+class TransactionType(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(20), unique=True, nullable=False)
+
+class LookupCodes:
+    """Process-wide cache of a lookup table's name <-> code mapping"""
+
+    def __init__(self, model):
+        self.model = model
+        self.codes = {}
+        self.names = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        # Session.connection() does not autoflush, so this is safe while a statement is being prepared
+        rows = db.session.connection().execute(select(self.model.id, self.model.name)).all()
+        with self._lock:
+            self.codes = {name: code for code, name in rows}
+            self.names = {code: name for code, name in rows}
+
+    def code(self, name):
+        code = self.codes.get(name)
+        if code is None:
+            # Possibly added by another process since we last loaded
+            self.load()
+            code = self.codes.get(name)
+        # Unknown names get a code no row has, so filters on them match nothing
+        return 0 if code is None else code
+
+    def name(self, code):
+        name = self.names.get(code)
+        if name is None:
+            self.load()
+            name = self.names.get(code)
+        return name
+
+    def ensure(self, names):
+        """Add unseen names inside the caller's transaction before rows referencing them are written"""
+        missing = set(names) - self.codes.keys()
+        if not missing:
+            return
+        self.load()
+        missing -= self.codes.keys()
+        if not missing:
+            return
+        db.session.execute(
+            sqlite_insert(self.model.__table__).values([{'name': name} for name in sorted(missing)]).on_conflict_do_nothing()
+        )
+        self.load()
+        db.session.info.setdefault('new_lookup_names', []).append((self, missing))
+
+    def forget(self, names):
+        with self._lock:
+            for name in names:
+                code = self.codes.pop(name, None)
+                self.names.pop(code, None)
+
+category_codes = LookupCodes(Category)
+type_codes = LookupCodes(TransactionType)
+
+class LookupCode(db.TypeDecorator):
+    """String values in Python, small integer codes into a lookup table in the database"""
+    impl = db.SmallInteger
+    cache_ok = True
+
+    def __init__(self, lookup):
+        super().__init__()
+        self.lookup = lookup
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else self.lookup.code(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else self.lookup.name(value)
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_rolled_back_names(session):
+    # A rolled-back insert frees its code for reuse, so the cached mapping must not keep it
+    for lookup, names in session.info.pop('new_lookup_names', ()):
+        lookup.forget(names)
+
+@event.listens_for(db.session, 'after_commit')
+def _keep_committed_names(session):
+    session.info.pop('new_lookup_names', None)
+
+def seed_lookups():
+    """Insert the seeded categories and transaction types, keeping existing codes"""
+    for model, names in ((Category, SEEDED_CATEGORIES), (TransactionType, SEEDED_TRANSACTION_TYPES)):
+        db.session.execute(
+            sqlite_insert(model.__table__).values([{'name': name} for name in names]).on_conflict_do_nothing()
+        )
+    db.session.commit()
+    # Warm the code caches at startup so the first requests do not each pay for loading them
+    category_codes.load()
+    type_codes.load()
@@ -0,0 +1,63 @@
+import datetime
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The app is created at import time from the environment, so point it at a scratch database first
+_database_dir = tempfile.mkdtemp(prefix='finance-tracker-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_database_dir, 'test.db')
+os.environ['FLASK_JOBS_MODE'] = 'worker'
+os.environ['FLASK_PASSWORD_HASH_MODE'] = 'inline'
+os.environ['FLASK_BCRYPT_LOG_ROUNDS'] = '4'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app, db  # noqa: E402
+from models import User, Transaction, Budget, SavingGoal  # noqa: E402
+
+CATEGORIES = ('food', 'housing', 'utilities', 'entertainment')
+_user_numbers = itertools.count(1)
+
+@pytest.fixture(scope='session')
+def app():
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    return flask_app
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
+        db.session.remove()
+
+@pytest.fixture
+def make_user(app_context):
+    """Create a user with a spread of transactions, budgets and a goal; returns the user id"""
+    def make(transactions=60):
+        number = next(_user_numbers)
+        user_id = User.create_user(f'user{number}', f'user{number}@example.com', 'password')
+        today = datetime.date.today()
+        for i in range(transactions):
+            recurring = i % 20 == 0
+            Transaction.add_transaction(
+                user_id, f'Transaction {i}', round(5 + (i * 37) % 200, 2), CATEGORIES[i % len(CATEGORIES)],
+                today - datetime.timedelta(days=(i * 7) % 400), 'income' if i % 3 == 0 else 'expense',
+                recurring=recurring, recurring_interval='monthly' if recurring else None
+            )
+        Budget.add_budget(user_id, 'food', 500, 'monthly')
+        Budget.add_budget(user_id, 'housing', 900, 'yearly')
+        SavingGoal.add_goal(user_id, 'Holiday', 2000, today + datetime.timedelta(days=180), 250)
+        return user_id
+    return make
+
+@pytest.fixture
+def login(app):
+    """A test client whose session is logged in as the given user"""
+    def client_for(user_id):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        return client
+    return client_for
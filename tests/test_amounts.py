@@ -0,0 +1,22 @@
+import pytest
+
+from models import Transaction
+from storage import MAX_AMOUNT, Cents
+
+@pytest.mark.parametrize('amount', [MAX_AMOUNT * 1.5, -MAX_AMOUNT * 1.5, 1e300, float('inf'), float('nan')])
+def test_cents_rejects_amounts_it_cannot_store(amount):
+    with pytest.raises(ValueError):
+        Cents().process_bind_param(amount, None)
+
+def test_cents_stores_the_largest_amount():
+    assert Cents().process_bind_param(MAX_AMOUNT, None) == MAX_AMOUNT * 100
+
+@pytest.mark.parametrize('amount', ['1e17', '1e300', '-1e300'])
+def test_transaction_form_rejects_out_of_range_amount(make_user, login, amount):
+    user_id = make_user(transactions=0)
+    response = login(user_id).post('/transactions', data={
+        'description': 'Huge', 'amount': amount, 'category': 'food', 'date': '2024-01-31',
+        'transaction_type': 'expense', 'recurring_interval': 'monthly'
+    })
+    assert response.status_code == 200
+    assert Transaction.query.filter_by(user_id=user_id).count() == 0
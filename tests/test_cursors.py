@@ -0,0 +1,45 @@
+import base64
+import json
+
+import pytest
+
+from models import Transaction
+
+def make_cursor(value, transaction_id=1):
+    return base64.urlsafe_b64encode(json.dumps([value, transaction_id]).encode()).decode()
+
+@pytest.mark.parametrize('sort_by, value', [
+    ('date', '2024-01-31'),
+    ('amount', 12.5),
+    ('amount', 40),
+    ('category', 'food'),
+])
+def test_cursor_round_trips_valid_values(sort_by, value):
+    decoded, transaction_id = Transaction.decode_cursor(make_cursor(value, 7), sort_by)
+    assert transaction_id == 7
+    assert (decoded.isoformat() if sort_by == 'date' else decoded) == value
+
+@pytest.mark.parametrize('sort_by, cursor', [
+    ('amount', make_cursor('12.5')),
+    ('amount', make_cursor(True)),
+    ('amount', make_cursor(None)),
+    ('amount', make_cursor(1e300)),
+    ('amount', make_cursor(float('nan'))),
+    ('category', make_cursor(5)),
+    ('category', make_cursor(['food'])),
+    ('date', make_cursor(20240131)),
+    ('date', make_cursor('yesterday')),
+    ('date', make_cursor('2024-01-31', '7')),
+    ('date', make_cursor('2024-01-31', 2 ** 64)),
+    ('date', make_cursor('2024-01-31', 1.5)),
+    ('date', base64.urlsafe_b64encode(b'{"value": 1}').decode()),
+    ('date', 'not base64!'),
+])
+def test_crafted_cursor_is_rejected(sort_by, cursor):
+    with pytest.raises(ValueError):
+        Transaction.decode_cursor(cursor, sort_by)
+
+def test_api_answers_crafted_cursor_with_400(make_user, login):
+    client = login(make_user(transactions=5))
+    response = client.get('/api/transactions', query_string={'sort_by': 'amount', 'cursor': make_cursor({'x': 1})})
+    assert response.status_code == 400
@@ -0,0 +1,21 @@
+from app import db
+from http_cache import page_cache
+from insights_cache import insights_cache
+from instrumentation import QueryCounter
+from loaders import DASHBOARD_QUERY_BUDGET
+from models import UserSettings, settings_cache
+
+def test_cold_dashboard_stays_within_query_budget(make_user, login):
+    user_id = make_user()
+    # Settings exist (login creates them), but nothing for this user is cached yet
+    UserSettings.get_settings(user_id)
+    settings_cache.clear()
+    insights_cache.clear()
+    page_cache.clear()
+    client = login(user_id)
+
+    with QueryCounter(db.engine) as counter:
+        response = client.get('/dashboard')
+
+    assert response.status_code == 200
+    assert counter.count <= DASHBOARD_QUERY_BUDGET, '\n'.join(counter.statements)
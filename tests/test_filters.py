@@ -0,0 +1,16 @@
+import pytest
+
+@pytest.mark.parametrize('path', ['/api/transactions', '/api/insights/transactions'])
+@pytest.mark.parametrize('query', [{'min_amount': '1e300'}, {'max_amount': '-1e300'}, {'min_amount': 'nan'}])
+def test_out_of_range_amount_filter_is_a_400(make_user, login, path, query):
+    response = login(make_user(transactions=3)).get(path, query_string=query)
+    assert response.status_code == 400
+    assert 'min_amount and max_amount' in response.get_json()['error']
+
+def test_out_of_range_amount_filter_redirects_the_listing(make_user, login):
+    client = login(make_user(transactions=3))
+    response = client.get('/transactions', query_string={'min_amount': '1e300'})
+    assert response.status_code == 302
+    with client.session_transaction() as session:
+        (category, message), = session['_flashes']
+    assert category == 'danger' and 'min_amount and max_amount' in message
@@ -0,0 +1,40 @@
+import io
+
+import importer
+from importer import import_transactions, iter_rows
+from models import Transaction
+
+CSV_HEADER = 'Date,Description,Category,Type,Amount,Recurring\n'
+
+def import_csv(user_id, lines, chunk_size=1000):
+    stream = io.BytesIO((CSV_HEADER + ''.join(lines)).encode())
+    return import_transactions(user_id, iter_rows(stream, 'csv'), chunk_size)
+
+def test_out_of_range_amount_is_a_row_error(make_user):
+    user_id = make_user(transactions=0)
+    report = import_csv(user_id, [
+        '2024-01-01,Coffee,food,expense,3.5,No\n',
+        '2024-01-02,Typo,food,expense,1e300,No\n',
+        '2024-01-03,Salary,income,income,2500,No\n',
+    ])
+
+    assert report['imported'] == 2
+    assert report['error_count'] == 1
+    assert report['errors'][0]['row'] == 2
+    assert Transaction.query.filter_by(user_id=user_id).count() == 2
+
+def test_chunk_that_fails_to_store_keeps_its_valid_rows(make_user, monkeypatch):
+    # Let an unstorable amount past validation so the insert itself fails
+    monkeypatch.setattr(importer, 'MAX_CURSOR_AMOUNT', float('inf'))
+    user_id = make_user(transactions=0)
+    report = import_csv(user_id, [
+        '2024-01-01,Coffee,food,expense,3.5,No\n',
+        '2024-01-02,Typo,food,expense,1e17,No\n',
+        '2024-01-03,Salary,income,income,2500,No\n',
+        '2024-01-04,Lunch,food,expense,12,No\n',
+    ], chunk_size=3)
+
+    assert report['imported'] == 3
+    assert [error['row'] for error in report['errors']] == [2]
+    assert 'outside the storable range' in report['errors'][0]['error']
+    assert Transaction.query.filter_by(user_id=user_id).count() == 3
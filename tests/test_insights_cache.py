@@ -0,0 +1,21 @@
+from insights_cache import InsightsCache, MemoryBackend, SQLiteBackend
+
+def counting_compute(calls):
+    def compute():
+        calls.append(1)
+        return [{'message': f'computed {len(calls)}'}]
+    return compute
+
+def test_entry_is_only_served_for_its_data_version(tmp_path):
+    for backend in (MemoryBackend(), SQLiteBackend(str(tmp_path / 'insights.db'))):
+        cache = InsightsCache(backend)
+        calls = []
+        compute = counting_compute(calls)
+
+        first = cache.get_or_compute(1, 3, compute)
+        assert cache.get_or_compute(1, 3, compute) == first
+        assert len(calls) == 1
+
+        # A write bumped the version; the old entry must not be served even without an invalidate
+        assert cache.get_or_compute(1, 4, compute) != first
+        assert len(calls) == 2
@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import db
+
+def test_failed_statement_does_not_leave_a_start_time_on_the_connection(app_context):
+    with db.engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text('SELECT * FROM no_such_table'))
+        conn.execute(text('SELECT 1'))
+        assert conn.info['query_start_time'] == []
+
+def test_failed_statement_is_counted_for_the_request(app):
+    with app.test_request_context('/'):
+        app.preprocess_request()
+        with pytest.raises(OperationalError):
+            db.session.execute(text('SELECT * FROM no_such_table'))
+        db.session.rollback()
+        from flask import g
+        assert g.query_stats['failed'] == 1
+        assert g.query_stats['count'] == 1
@@ -0,0 +1,29 @@
+import pytest
+from flask import Flask
+
+from passwords import PasswordHasher
+
+@pytest.fixture
+def hasher():
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_MODE='process', BCRYPT_LOG_ROUNDS=4, PASSWORD_HASH_WORKERS=1)
+    hasher = PasswordHasher()
+    hasher.init_app(app)
+    if hasher.mode != 'process':
+        pytest.skip('fork is not available')
+    yield hasher
+    hasher.shutdown()
+
+def test_pool_is_started_by_init_app(hasher):
+    assert hasher.executor is not None
+    assert hasher.executor._processes
+
+def test_hasher_replaces_a_pool_whose_worker_died(hasher):
+    for process in list(hasher.executor._processes.values()):
+        process.kill()
+        process.join()
+
+    password_hash = hasher.hash('correct horse')
+
+    assert hasher.check(password_hash, 'correct horse')
+    assert hasher.stats()['restarts'] == 1
@@ -0,0 +1,30 @@
+import re
+
+import pytest
+
+from commands import explain_query_plan, hot_queries
+
+# The index each hot query is expected to search; a missing or renamed index shows up here first
+EXPECTED_INDEXES = {
+    'transactions by date': 'ix_transaction_user_date',
+    'transactions by amount': 'ix_transaction_user_amount',
+    'transactions by category': 'ix_transaction_user_category',
+    'category spend since date': 'ix_transaction_user_type_category_date',
+    'budget upsert lookup': 'ix_budget_user_category_period',
+    'saving goals': 'ix_saving_goal_user_deadline',
+}
+# Even an index-ordered SCAN reads every user's transactions; the per-user queries must SEARCH
+TRANSACTION_SCAN = re.compile(r'\bSCAN "?transaction\b')
+
+def test_every_hot_query_has_an_expected_index(app_context):
+    assert set(hot_queries()) == set(EXPECTED_INDEXES)
+
+@pytest.mark.parametrize('name', sorted(EXPECTED_INDEXES))
+def test_hot_query_plan_uses_expected_index(app_context, name):
+    plan = explain_query_plan(hot_queries()[name])
+    details = '; '.join(plan)
+
+    assert re.search(rf'USING (COVERING )?INDEX {EXPECTED_INDEXES[name]}\b', details), details
+    assert not TRANSACTION_SCAN.search(details), details
+    assert not any(detail.startswith('SCAN') and 'USING' not in detail for detail in plan), details
+    assert 'USE TEMP B-TREE' not in details, details
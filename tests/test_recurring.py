@@ -0,0 +1,75 @@
+import datetime
+import io
+
+from app import db
+from importer import import_transactions, iter_rows
+from models import Transaction
+from recurring import MAX_PROJECTION_DAYS, materialize_recurring
+from routes import export_json_chunks
+from utils import add_months
+
+def add_series(user_id, description, months_ago, amount=1200.0):
+    start = add_months(datetime.date.today(), -months_ago)
+    return Transaction.add_transaction(user_id, description, amount, 'housing', start, 'expense',
+                                       recurring=True, recurring_interval='monthly')
+
+def user_rows(user_id):
+    return sorted(
+        (t.description, t.amount, t.category, t.type, t.date, t.recurring)
+        for t in Transaction.query.filter_by(user_id=user_id)
+    )
+
+def test_import_then_materialize_does_not_duplicate_occurrences(make_user):
+    source_id = make_user(transactions=0)
+    add_series(source_id, 'Rent', months_ago=6)
+    assert materialize_recurring(user_id=source_id)['created'] == 6
+
+    export = ''.join(export_json_chunks(source_id)).encode()
+    target_id = make_user(transactions=0)
+    assert import_transactions(target_id, iter_rows(io.BytesIO(export), 'json'))['imported'] == 7
+
+    # The imported series resumes after its own date and adopts the imported occurrences
+    series = Transaction.query.filter_by(user_id=target_id, recurring=True).one()
+    assert series.next_occurrence == add_months(series.date, 1)
+    report = materialize_recurring(user_id=target_id)
+    assert report['created'] == 0
+    assert report['linked'] == 6
+    assert user_rows(target_id) == user_rows(source_id)
+    assert Transaction.query.filter_by(user_id=target_id, series_id=series.id).count() == 6
+
+    assert materialize_recurring(user_id=target_id)['series'] == 0
+    assert user_rows(target_id) == user_rows(source_id)
+
+def test_conflicting_series_does_not_block_the_rest_of_its_batch(make_user):
+    user_id = make_user(transactions=0)
+    rent_id = add_series(user_id, 'Rent', months_ago=3)
+    gym_id = add_series(user_id, 'Gym', months_ago=3, amount=40.0)
+
+    # Simulate another run that wrote Rent's next occurrence but had not advanced the series yet
+    rent = db.session.get(Transaction, rent_id)
+    db.session.add(Transaction(
+        user_id=user_id, description='Rent', amount=rent.amount, category='housing', date=rent.next_occurrence,
+        type='expense', recurring=False, series_id=rent_id
+    ))
+    db.session.commit()
+
+    report = materialize_recurring(user_id=user_id)
+    assert report['conflicts'] == 1
+    assert report['created'] == 3
+    assert Transaction.query.filter_by(series_id=gym_id).count() == 3
+    assert Transaction.query.filter_by(series_id=rent_id).count() == 1
+
+def test_projection_days_is_validated_on_its_own(make_user, login):
+    client = login(make_user(transactions=0))
+    url = '/api/recurring/projection'
+
+    response = client.get(url, query_string={'days': 10 ** 9})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == f'days must be between 0 and {MAX_PROJECTION_DAYS}'
+
+    response = client.get(url, query_string={'days': 'soon'})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'days must be a whole number'
+
+    response = client.get(url, query_string={'days': 30})
+    assert response.status_code == 200
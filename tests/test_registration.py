@@ -0,0 +1,19 @@
+import pytest
+
+from app import db
+from models import User
+
+@pytest.mark.parametrize('password', ['p' * 80, 'é' * 40])
+def test_register_rejects_password_bcrypt_cannot_hash(app_context, app, password):
+    response = app.test_client().post('/register', data={
+        'username': 'longpass', 'email': 'longpass@example.com',
+        'password': password, 'confirm_password': password
+    })
+    assert response.status_code == 200
+    assert b'at most 72 bytes' in response.data
+    assert User.query.filter_by(username='longpass').count() == 0
+
+def test_login_with_overlong_password_fails_cleanly(make_user, app):
+    email = db.session.get(User, make_user(transactions=0)).email
+    response = app.test_client().post('/login', data={'email': email, 'password': 'p' * 80})
+    assert response.status_code == 200
@@ -0,0 +1,20 @@
+from models import UserSettings, settings_cache
+
+def test_user_load_goes_through_the_settings_cache(make_user, app):
+    user_id = make_user(transactions=0)
+    UserSettings.get_settings(user_id)
+    settings_cache.invalidate(user_id)
+    before = settings_cache.stats()
+
+    for _ in range(2):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+        # A fresh app context per request, so g does not carry the loaded user over
+        with app.app_context():
+            assert client.get('/settings').status_code == 200
+
+    after = settings_cache.stats()
+    assert after['misses'] - before['misses'] == 1
+    assert after['hits'] - before['hits'] >= 1
+    assert settings_cache.get(user_id).user_id == user_id
@@ -0,0 +1,16 @@
+from app import app, db
+from models import MonthlyRollup
+
+def test_upgrade_schema_backfills_an_empty_rollup_table(make_user):
+    user_id = make_user(transactions=20)
+    expected = sorted((r.year_month, r.category, r.type, r.total, r.count) for r in MonthlyRollup.get_rollups(user_id))
+    # What a database from before the rollups looks like after create_all adds the table
+    db.session.execute(MonthlyRollup.__table__.delete())
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['upgrade-schema'])
+
+    assert 'Backfilled' in result.output, result.output
+    rebuilt = sorted((r.year_month, r.category, r.type, r.total, r.count) for r in MonthlyRollup.get_rollups(user_id))
+    assert rebuilt == expected
+    assert 'Backfilled' not in app.test_cli_runner().invoke(args=['upgrade-schema']).output
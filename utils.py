@@ -1,3 +1,4 @@
+import calendar
 import datetime
 from collections import defaultdict
 
@@ -118,13 +119,35 @@ def calculate_monthly_expenses(transactions):
         'data': monthly_data
     }
 
-def calculate_budget_status(budgets, transactions):
-    """Calculate current spending against budget limits"""
-    today = datetime.datetime.today()
-    start_of_month = today.replace(day=1)
-    start_of_week = today - datetime.timedelta(days=today.weekday())
-    start_of_year = today.replace(month=1, day=1)
+BUDGET_PERIODS = ('weekly', 'monthly', 'yearly')
+
+def budget_period_starts(today=None):
+    """Start date of the current week, month and year keyed by budget period"""
+    today = today or datetime.date.today()
+    return {
+        'weekly': today - datetime.timedelta(days=today.weekday()),
+        'monthly': today.replace(day=1),
+        'yearly': today.replace(month=1, day=1)
+    }
+
+def calculate_period_spending(transactions, period_starts=None):
+    """Bucket expense spending by (category, budget period) in a single pass"""
+    if period_starts is None:
+        period_starts = budget_period_starts()
+    
+    spending = defaultdict(float)
     
+    for transaction in transactions:
+        if transaction.type != 'expense':
+            continue
+        for period, period_start in period_starts.items():
+            if transaction.date >= period_start:
+                spending[(transaction.category, period)] += transaction.amount
+    
+    return spending
+
+def calculate_budget_status(budgets, spending):
+    """Calculate current spending against budget limits from bucketed period spending"""
     budget_status = []
     
     for budget in budgets:
@@ -132,29 +155,9 @@ def calculate_budget_status(budgets, transactions):
         limit = budget.limit_amount
         period = budget.period
         
-        # Determine period start date
-        if period == 'weekly':
-            period_start = start_of_week
-        elif period == 'monthly':
-            period_start = start_of_month
-        elif period == 'yearly':
-            period_start = start_of_year
-        else:
-            period_start = start_of_month  # Default to monthly
-        
-        # Convert to datetime.date for comparison
-        if isinstance(period_start, datetime.datetime):
-            period_start_date = period_start.date()
-        else:
-            period_start_date = period_start
-        
-        # Calculate total spending in this category for the period
-        spent = 0
-        for transaction in transactions:
-            if (transaction.type == 'expense' and 
-                transaction.category == category and
-                transaction.date >= period_start_date):
-                spent += transaction.amount
+        # Unknown periods default to monthly
+        period_key = period if period in BUDGET_PERIODS else 'monthly'
+        spent = spending.get((category, period_key), 0)
         
         # Calculate percentage
         percentage = (spent / limit * 100) if limit > 0 else 0
@@ -176,19 +179,75 @@ def calculate_budget_status(budgets, transactions):
     
     return budget_status
 
+def month_starts(today, count=6):
+    """First day of each of the last `count` calendar months, oldest first"""
+    year, month = today.year, today.month
+    starts = []
+    for _ in range(count):
+        starts.append(datetime.date(year, month, 1))
+        month -= 1
+        if month == 0:
+            year -= 1
+            month = 12
+    return list(reversed(starts))
+
+def summarize_rollups(rollups):
+    """Income, expense and balance totals plus the transaction count from monthly rollups"""
+    totals = defaultdict(float)
+    transaction_count = 0
+    for rollup in rollups:
+        totals[rollup.type] += rollup.total
+        transaction_count += rollup.count
+    
+    return {
+        'total_income': totals['income'],
+        'total_expenses': totals['expense'],
+        'current_balance': totals['income'] - totals['expense'],
+        'transaction_count': transaction_count
+    }
+
+def calculate_category_expenses_from_rollups(rollups):
+    """Calculate expenses by category for pie chart from monthly rollups"""
+    if not rollups:
+        return {'labels': [], 'data': []}
+
+    category_expenses = defaultdict(float)
+
+    for rollup in rollups:
+        if rollup.type == 'expense':
+            category = str(rollup.category) if rollup.category else 'Uncategorized'
+            category_expenses[category] += rollup.total
+
+    if not category_expenses:
+        return {'labels': ['No expenses'], 'data': [1]}
+
+    return {
+        'labels': list(category_expenses.keys()),
+        'data': list(category_expenses.values())
+    }
+
+def calculate_monthly_expenses_from_rollups(rollups):
+    """Calculate monthly expenses for the past 6 calendar months from monthly rollups"""
+    if not rollups:
+        return {'labels': [], 'data': []}
+
+    monthly_totals = defaultdict(float)
+    for rollup in rollups:
+        if rollup.type == 'expense':
+            monthly_totals[rollup.year_month] += rollup.total
+
+    months = month_starts(datetime.date.today())
+
+    return {
+        'labels': [month.strftime('%b %Y') for month in months],
+        'data': [monthly_totals.get(month.strftime('%Y-%m'), 0.0) for month in months]
+    }
+
 def generate_insights(transactions, budgets):
     """Generate smart insights based on user data"""
-    insights = []
-    
     # Only analyze if we have enough transactions
     if len(transactions) < 3:
-        insights.append({
-            'type': 'info',
-            'title': 'Not enough data',
-            'message': 'Add more transactions to see personalized insights.',
-            'icon': 'info-circle'
-        })
-        return insights
+        return not_enough_data_insights()
     
     # Get today's date
     today = datetime.datetime.today()
@@ -220,6 +279,53 @@ def generate_insights(transactions, budgets):
             elif transaction_date >= start_of_previous_month_date and transaction_date < start_of_current_month_date:
                 previous_month_expenses[category] += amount
     
+    recurring_expense = None
+    for transaction in transactions:
+        if (transaction.type == 'expense' and 
+            transaction.recurring and 
+            hasattr(transaction, 'date')):
+            recurring_expense = transaction
+            break
+    
+    spending = calculate_period_spending(transactions)
+    
+    return build_insights(current_month_expenses, previous_month_expenses, budgets, spending, recurring_expense)
+
+def generate_insights_from_rollups(rollups, budgets, spending, recurring_expense=None):
+    """Generate smart insights from monthly rollups instead of raw transactions"""
+    if sum(rollup.count for rollup in rollups) < 3:
+        return not_enough_data_insights()
+    
+    start_of_current_month = datetime.date.today().replace(day=1)
+    start_of_previous_month = (start_of_current_month - datetime.timedelta(days=1)).replace(day=1)
+    current_month = start_of_current_month.strftime('%Y-%m')
+    previous_month = start_of_previous_month.strftime('%Y-%m')
+    
+    current_month_expenses = defaultdict(float)
+    previous_month_expenses = defaultdict(float)
+    
+    for rollup in rollups:
+        if rollup.type == 'expense':
+            if rollup.year_month >= current_month:
+                current_month_expenses[rollup.category] += rollup.total
+            elif rollup.year_month == previous_month:
+                previous_month_expenses[rollup.category] += rollup.total
+    
+    return build_insights(current_month_expenses, previous_month_expenses, budgets, spending, recurring_expense)
+
+def not_enough_data_insights():
+    """Placeholder insight for users without enough history"""
+    return [{
+        'type': 'info',
+        'title': 'Not enough data',
+        'message': 'Add more transactions to see personalized insights.',
+        'icon': 'info-circle'
+    }]
+
+def build_insights(current_month_expenses, previous_month_expenses, budgets, spending, recurring_expense=None):
+    """Turn per-category monthly spending into insight cards"""
+    insights = []
+    
     # Generate spending trend insights
     for category, current_amount in current_month_expenses.items():
         if category in previous_month_expenses and previous_month_expenses[category] > 0:
@@ -241,15 +347,12 @@ def generate_insights(transactions, budgets):
                     'icon': 'arrow-down'
                 })
     
-    # Budget warnings
+    # Budget warnings use the same period spending as the budget status
     for budget in budgets:
         category = budget.category
         limit = budget.limit_amount
         
-        spent = sum(t.amount for t in transactions 
-                  if t.type == 'expense' 
-                  and t.category == category 
-                  and t.date >= start_of_current_month_date)
+        spent = spending.get((category, 'monthly'), 0)
         
         percentage = (spent / limit * 100) if limit > 0 else 0
         
@@ -269,17 +372,122 @@ def generate_insights(transactions, budgets):
             })
     
     # Upcoming goal deadlines
-    for transaction in transactions:
-        if (transaction.type == 'expense' and 
-            transaction.recurring and 
-            hasattr(transaction, 'date')):
-            
-            insights.append({
-                'type': 'info',
-                'title': 'Recurring expense reminder',
-                'message': f"Don't forget about your recurring {transaction.description} payment.",
-                'icon': 'sync'
-            })
-            break  # Just show one reminder
+    if recurring_expense:
+        message = f"Don't forget about your recurring {recurring_expense.description} payment."
+        due = getattr(recurring_expense, 'next_occurrence', None)
+        if due:
+            message = f"Your recurring {recurring_expense.description} payment is next due on {due.strftime('%b %d, %Y')}."
+        insights.append({
+            'type': 'info',
+            'title': 'Recurring expense reminder',
+            'message': message,
+            'icon': 'sync'
+        })
     
-    return insights
\ No newline at end of file
+    return insights
+
+
+TIMESERIES_GRANULARITIES = ('day', 'week', 'month', 'quarter', 'year')
+
+def period_start(date, granularity):
+    """Calendar start of the day/week/month/quarter/year containing date"""
+    if granularity == 'day':
+        return date
+    if granularity == 'week':
+        return date - datetime.timedelta(days=date.weekday())
+    if granularity == 'quarter':
+        return date.replace(month=(date.month - 1) // 3 * 3 + 1, day=1)
+    if granularity == 'year':
+        return date.replace(month=1, day=1)
+    return date.replace(day=1)
+
+def next_period_start(date, granularity):
+    """Start of the period following the one that starts at date"""
+    if granularity == 'day':
+        return date + datetime.timedelta(days=1)
+    if granularity == 'week':
+        return date + datetime.timedelta(days=7)
+    if granularity == 'year':
+        return date.replace(year=date.year + 1)
+    months = 3 if granularity == 'quarter' else 1
+    month_index = date.month - 1 + months
+    return date.replace(year=date.year + month_index // 12, month=month_index % 12 + 1)
+
+def period_starts_between(start, end, granularity):
+    """Every calendar period start from the one containing start through the one containing end"""
+    current = period_start(start, granularity)
+    starts = []
+    while current <= end:
+        starts.append(current)
+        current = next_period_start(current, granularity)
+    return starts
+
+def build_timeseries(rows, start, end, granularity, transaction_types=('income', 'expense')):
+    """Fill grouped (period start, type, total, count) rows into dense per-type series"""
+    periods = [period.isoformat() for period in period_starts_between(start, end, granularity)]
+    index = {period: i for i, period in enumerate(periods)}
+    series = {transaction_type: [0.0] * len(periods) for transaction_type in transaction_types}
+    counts = [0] * len(periods)
+
+    for period, transaction_type, total, count in rows:
+        i = index.get(period)
+        if i is None or transaction_type not in series:
+            continue
+        series[transaction_type][i] += float(total or 0.0)
+        counts[i] += count
+
+    return {
+        'granularity': granularity,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'labels': periods,
+        'series': series,
+        'count': counts
+    }
+
+RECURRING_INTERVALS = ('daily', 'weekly', 'biweekly', 'monthly', 'quarterly', 'yearly')
+RECURRING_DAY_STEPS = {'daily': 1, 'weekly': 7, 'biweekly': 14}
+RECURRING_MONTH_STEPS = {'monthly': 1, 'quarterly': 3, 'yearly': 12}
+
+def add_months(date, months):
+    """Shift date by whole months, clamping the day to the end of shorter months"""
+    month_index = date.month - 1 + months
+    year = date.year + month_index // 12
+    month = month_index % 12 + 1
+    return date.replace(year=year, month=month, day=min(date.day, calendar.monthrange(year, month)[1]))
+
+def recurrence_date(anchor, interval, index):
+    """Date of the index-th occurrence of a series starting at anchor"""
+    # Always offset from the anchor so a series on the 31st returns to the 31st after February
+    if interval in RECURRING_DAY_STEPS:
+        return anchor + datetime.timedelta(days=RECURRING_DAY_STEPS[interval] * index)
+    return add_months(anchor, RECURRING_MONTH_STEPS[interval] * index)
+
+def iter_occurrences(anchor, interval, start):
+    """Occurrences after the anchor itself, from the first one on or after start"""
+    # Jump straight to the period containing start instead of stepping from the anchor
+    if interval in RECURRING_DAY_STEPS:
+        index = -(-(start - anchor).days // RECURRING_DAY_STEPS[interval])
+    else:
+        elapsed_months = (start.year - anchor.year) * 12 + start.month - anchor.month
+        index = elapsed_months // RECURRING_MONTH_STEPS[interval]
+    index = max(index, 1)
+
+    while True:
+        date = recurrence_date(anchor, interval, index)
+        if date >= start:
+            yield date
+        index += 1
+
+def occurrences_between(anchor, interval, start, end, limit=None):
+    """Occurrence dates of a series within [start, end], at most limit of them"""
+    dates = []
+    for date in iter_occurrences(anchor, interval, start):
+        if date > end or (limit is not None and len(dates) >= limit):
+            break
+        dates.append(date)
+    return dates
+
+def next_occurrence(anchor, interval, after):
+    """First occurrence of a series strictly after the given date"""
+    return next(iter_occurrences(anchor, interval, after + datetime.timedelta(days=1)))
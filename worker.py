@@ -0,0 +1,8 @@
+from app import app
+from jobs import run_worker
+from loaders import compute_derived_view
+from models import DerivedView
+
+# Run next to the web app started with JOBS_MODE=worker, to move precomputation out of its process
+if __name__ == '__main__':
+    run_worker(app, compute_derived_view, DerivedView.stale_user_ids)